@@ -7,12 +7,13 @@ Run with:  streamlit run app.py
 
 import streamlit as st
 import pandas as pd
-from PIL import Image
 import os
 import sys
 
 sys.path.append(os.path.dirname(__file__))
+from image_store import ImageStore
 from matching_engine import OutfitMatcher
+from recommendation_store import RecommendationStore
 
 st.set_page_config(
     page_title="Vinted Outfit Match",
@@ -91,29 +92,27 @@ hr { border-color: #ebebeb !important; margin: 24px 0 !important; }
 """, unsafe_allow_html=True)
 
 
-IMAGE_DIR = "data/images"
+BROWSE_PAGE_SIZE = 60
+# Columns the browse cards show
+BROWSE_COLUMNS = ["id", "productDisplayName", "price", "condition"]
 
 @st.cache_resource(show_spinner="Loading catalog...")
 def load_matcher():
-    return OutfitMatcher()
-
-@st.cache_data(show_spinner=False)
-def load_catalog():
-    df = pd.read_csv("data/vinted_catalog.csv", on_bad_lines="skip")
-    df["usage"]      = df["usage"].fillna("Casual")
-    df["season"]     = df["season"].fillna("Fall")
-    df["baseColour"] = df["baseColour"].fillna("Multi")
-    df = df[df["masterCategory"].isin(["Apparel", "Accessories", "Footwear"])].copy()
-    return df.reset_index(drop=True)
-
-def get_image(item_id):
-    path = os.path.join(IMAGE_DIR, f"{int(item_id)}.jpg")
-    if os.path.exists(path):
-        try:
-            return Image.open(path)
-        except Exception:
-            return None
-    return None
+    # Serve precomputed recommendations when recommendation_store.py has run;
+    # catalog and rule file changes are picked up in the background
+    return OutfitMatcher(recommendations=RecommendationStore.open(), watch_interval=30)
+
+@st.cache_resource
+def load_images():
+    # Prebuilt thumbnails (image_store.py) behind a shared byte cache, read
+    # from the packed archive when one was built
+    images = ImageStore()
+    # First browse page (unfiltered catalog order) is ready before anyone asks
+    images.prewarm(load_matcher().df["id"].head(BROWSE_PAGE_SIZE))
+    return images
+
+def get_image(item_id, size="grid"):
+    return load_images().get(item_id, size)
 
 def condition_badge(cond):
     mapping = {
@@ -146,10 +145,41 @@ if "selected_item_id" not in st.session_state:
     st.session_state.selected_item_id = None
 if "show_bundle" not in st.session_state:
     st.session_state.show_bundle = False
+if "browse_offset" not in st.session_state:
+    st.session_state.browse_offset = 0
+    st.session_state.browse_query = None
 
 navbar()
 matcher = load_matcher()
-df = load_catalog()
+
+
+# Browse dropdowns: column -> (label, "no filter" option)
+BROWSE_FACETS = {
+    "gender":         ("Gender",   "All genders"),
+    "masterCategory": ("Category", "All categories"),
+    "usage":          ("Occasion", "All occasions"),
+    "season":         ("Season",   "All seasons"),
+}
+
+def selected_facets(skip=None):
+    """{column: value} of the browse dropdowns currently set to a value."""
+    filters = {}
+    for column, (_, all_label) in BROWSE_FACETS.items():
+        value = st.session_state.get(f"facet_{column}", all_label)
+        if column != skip and value != all_label:
+            filters[column] = value
+    return filters
+
+def facet_select(column):
+    label, all_label = BROWSE_FACETS[column]
+    facets = matcher.catalog.facet_index
+    # Counts reflect the other dropdowns' current selections
+    counts = facets.counts(column, selected_facets(skip=column))
+    return st.selectbox(
+        label, [all_label] + facets.values(column), key=f"facet_{column}",
+        format_func=lambda v: v if v == all_label else f"{v} ({counts.get(v, 0):,})",
+        label_visibility="collapsed",
+    )
 
 
 def show_browse():
@@ -162,33 +192,25 @@ def show_browse():
         col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
         with col1:
             search = st.text_input("search", placeholder="e.g. blue jeans, floral dress...", label_visibility="collapsed")
-        with col2:
-            gender_opts = ["All genders"] + sorted(df["gender"].dropna().unique().tolist())
-            gender_f = st.selectbox("Gender", gender_opts, label_visibility="collapsed")
-        with col3:
-            cat_opts = ["All categories"] + sorted(df["masterCategory"].dropna().unique().tolist())
-            cat_f = st.selectbox("Category", cat_opts, label_visibility="collapsed")
-        with col4:
-            usage_opts = ["All occasions"] + sorted(df["usage"].dropna().unique().tolist())
-            usage_f = st.selectbox("Occasion", usage_opts, label_visibility="collapsed")
-        with col5:
-            season_opts = ["All seasons"] + sorted(df["season"].dropna().unique().tolist())
-            season_f = st.selectbox("Season", season_opts, label_visibility="collapsed")
+        for col, column in zip([col2, col3, col4, col5], BROWSE_FACETS):
+            with col:
+                facet_select(column)
         st.markdown('</div>', unsafe_allow_html=True)
 
-    filtered = df.copy()
-    if search:
-        filtered = filtered[filtered["productDisplayName"].str.contains(search, case=False, na=False)]
-    if gender_f != "All genders":
-        filtered = filtered[filtered["gender"] == gender_f]
-    if cat_f != "All categories":
-        filtered = filtered[filtered["masterCategory"] == cat_f]
-    if usage_f != "All occasions":
-        filtered = filtered[filtered["usage"] == usage_f]
-    if season_f != "All seasons":
-        filtered = filtered[filtered["season"] == season_f]
-
-    total = len(filtered)
+    # Back to the first page whenever the search or filters change
+    filters = selected_facets()
+    query = (search.strip(), tuple(sorted(filters.items())))
+    if query != st.session_state.browse_query:
+        st.session_state.browse_query = query
+        st.session_state.browse_offset = 0
+
+    # Facet bitmaps and the search index, then just this page's rows and
+    # the columns the cards show (see Catalog.browse)
+    page = matcher.catalog.browse(
+        search, filters, offset=st.session_state.browse_offset, page_size=BROWSE_PAGE_SIZE,
+        columns=BROWSE_COLUMNS,
+    )
+    total = page["total"]
     st.markdown(f'<div style="font-size:13px;color:#888;margin-bottom:16px;">{total:,} items found</div>', unsafe_allow_html=True)
 
     if total == 0:
@@ -196,7 +218,7 @@ def show_browse():
         st.markdown('</div>', unsafe_allow_html=True)
         return
 
-    sample = filtered.head(60)
+    sample = page["items"]
     cols_per_row = 5
     rows = [sample.iloc[i:i+cols_per_row] for i in range(0, len(sample), cols_per_row)]
 
@@ -224,9 +246,28 @@ def show_browse():
                     st.session_state.scroll_to_top = True
                     st.rerun()
 
+    browse_pager(page)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+def browse_pager(page):
+    num_pages = -(-page["total"] // BROWSE_PAGE_SIZE)
+    if num_pages <= 1:
+        return
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("← Previous", disabled=page["offset"] == 0, width="stretch"):
+            st.session_state.browse_offset = max(page["offset"] - BROWSE_PAGE_SIZE, 0)
+            st.rerun()
+    with label_col:
+        current = page["offset"] // BROWSE_PAGE_SIZE + 1
+        st.markdown(f'<div style="text-align:center;font-size:13px;color:#888;padding-top:8px;">Page {current} of {num_pages}</div>', unsafe_allow_html=True)
+    with next_col:
+        if st.button("Next →", disabled=page["next_offset"] is None, width="stretch"):
+            st.session_state.browse_offset = page["next_offset"]
+            st.rerun()
+
+
 def show_item_detail(item_id):
     st.components.v1.html("<script>window.parent.document.querySelector('section.main').scrollTo(0, 0);</script>", height=0)
     st.markdown('<div class="page-content">', unsafe_allow_html=True)
@@ -236,15 +277,14 @@ def show_item_detail(item_id):
         st.session_state.show_bundle = False
         st.rerun()
 
-    item_row = df[df["id"] == item_id]
-    if item_row.empty:
+    item = matcher.get_item(item_id)
+    if item is None:
         st.error("Item not found.")
         return
-    item = item_row.iloc[0]
 
     left, right = st.columns([1, 2])
     with left:
-        img = get_image(item_id)
+        img = get_image(item_id, size="detail")
         if img:
             st.image(img, width="stretch")
         else:
@@ -283,8 +323,8 @@ def show_item_detail(item_id):
             cols = st.columns(3)
             for i, match in enumerate(matches):
                 with cols[i % 3]:
-                    match_img = get_image(match["id"])
-                    same_seller = match["seller"] == item["seller"]
+                    match_img = get_image(match.id)
+                    same_seller = "same_seller" in match.reasons
                     st.markdown('<div class="match-card">', unsafe_allow_html=True)
                     if match_img:
                         st.image(match_img, width="stretch")
@@ -292,10 +332,10 @@ def show_item_detail(item_id):
                         st.markdown('<div style="background:#f0f0f0;height:160px;display:flex;align-items:center;justify-content:center;font-size:40px;">👚</div>', unsafe_allow_html=True)
                     st.markdown(f"""
                     <div class="match-card-body">
-                        <div class="item-card-price">€{match['price']}</div>
-                        <div class="item-card-name">{match['name'][:45]}</div>
-                        <div class="match-why">✦ {match['explanation']}</div>
-                        {condition_badge(match['condition'])}
+                        <div class="item-card-price">€{match.price}</div>
+                        <div class="item-card-name">{match.name[:45]}</div>
+                        <div class="match-why">✦ {match.explanation}</div>
+                        {condition_badge(match.condition)}
                     </div>
                     """, unsafe_allow_html=True)
                     if same_seller:
@@ -332,31 +372,31 @@ def show_item_detail(item_id):
             cols = st.columns(len(bundle))
             for col, piece in zip(cols, bundle):
                 with col:
-                    piece_img = get_image(piece["id"])
-                    is_seed = piece.get("is_seed", False)
+                    piece_img = get_image(piece.id)
+                    is_seed = piece.is_seed
                     border = "2px solid #09a89e" if is_seed else "1px solid #ebebeb"
                     st.markdown(f'<div style="background:#fff;border-radius:12px;border:{border};overflow:hidden;">', unsafe_allow_html=True)
                     if piece_img:
                         st.image(piece_img, width="stretch")
                     else:
                         st.markdown('<div style="background:#f0f0f0;height:140px;display:flex;align-items:center;justify-content:center;font-size:36px;">👕</div>', unsafe_allow_html=True)
-                    role_label = piece["role"].capitalize()
+                    role_label = piece.role.capitalize()
                     seed_label = " · Selected item" if is_seed else ""
                     st.markdown(f"""
                     <div style="padding:10px 12px 14px;">
                         <div style="font-size:10px;font-weight:600;color:#09a89e;text-transform:uppercase;letter-spacing:0.5px;">{role_label}{seed_label}</div>
-                        <div style="font-size:12px;color:#555;margin-top:2px;">{piece['name'][:40]}</div>
-                        <div style="font-size:15px;font-weight:700;margin-top:4px;">€{piece['price']}</div>
+                        <div style="font-size:12px;color:#555;margin-top:2px;">{piece.name[:40]}</div>
+                        <div style="font-size:15px;font-weight:700;margin-top:4px;">€{piece.price}</div>
                     </div>
                     """, unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
 
             if len(same_seller_items) > 1:
                 with st.expander("💡 Bundle tip — save on shipping"):
-                    st.write(f"**{len(same_seller_items)} items** in this outfit are from the same seller **{same_seller_items[0]['seller']}**.")
+                    st.write(f"**{len(same_seller_items)} items** in this outfit are from the same seller **{same_seller_items[0].seller}**.")
                     st.write("Message the seller to buy them together and pay shipping only once!")
                     for si in same_seller_items:
-                        st.write(f"  • {si['name'][:50]} — €{si['price']}")
+                        st.write(f"  • {si.name[:50]} — €{si.price}")
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,52 @@
+"""
+benchmarks/bench_batch.py
+-------------------------
+Per-seed get_matches/get_outfit_bundle loops vs. the batch entry points,
+extrapolated to a full catalog sweep.
+
+Run with:  python benchmarks/bench_batch.py [num_items] [num_seeds]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matching_engine import Catalog, OutfitMatcher
+from synthetic_catalog import make_catalog
+
+
+def _time(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # silence "no rules" notes
+        fn()
+    return time.perf_counter() - start
+
+
+def run(num_items, num_seeds):
+    catalog = Catalog(make_catalog(num_items))
+    matcher = OutfitMatcher(catalog=catalog)
+    rng = np.random.default_rng(1)
+    seed_ids = rng.choice(catalog.df["id"].to_numpy(), size=num_seeds, replace=False)
+
+    rows = [
+        ("get_matches loop",         _time(lambda: [matcher.get_matches(i) for i in seed_ids])),
+        ("get_matches_batch",        _time(lambda: matcher.get_matches_batch(seed_ids))),
+        ("get_outfit_bundle loop",   _time(lambda: [matcher.get_outfit_bundle(i) for i in seed_ids])),
+        ("get_outfit_bundles_batch", _time(lambda: matcher.get_outfit_bundles_batch(seed_ids))),
+    ]
+
+    print(f"\n{num_items:,} items, {num_seeds:,} seeds")
+    for label, seconds in rows:
+        sweep = seconds / num_seeds * num_items / 60
+        print(f"  {label:<26} {seconds:8.2f} s   (full sweep ≈ {sweep:7.1f} min)")
+
+
+if __name__ == "__main__":
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 40_000
+    num_seeds = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    run(num_items, num_seeds)
@@ -0,0 +1,77 @@
+"""
+benchmarks/bench_topk.py
+------------------------
+Full sort vs. partial (top-k) selection for get_matches and
+get_outfit_bundle, at Kaggle-snapshot size and at 1M items.
+
+Run with:  python benchmarks/bench_topk.py [num_items ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matching_engine import CATEGORY_COMPAT, Catalog, OutfitMatcher, top_k
+from synthetic_catalog import make_catalog
+
+NUM_SEEDS = 50
+NUM_MATCHES = 6
+
+
+def _timeit(fn, seeds):
+    start = time.perf_counter()
+    for seed in seeds:
+        fn(seed)
+    return (time.perf_counter() - start) / len(seeds) * 1000
+
+
+def run(num_items):
+    catalog = Catalog(make_catalog(num_items))
+    matcher = OutfitMatcher(catalog=catalog)
+    rng = np.random.default_rng(1)
+    # Seeds with compatibility rules (others return early from get_matches)
+    has_rules = catalog.df["articleType"].isin(list(CATEGORY_COMPAT)).to_numpy()
+    seed_positions = rng.choice(np.flatnonzero(has_rules), size=NUM_SEEDS, replace=False)
+
+    # Pre-score each seed's pools once, so only selection is timed
+    cases = []
+    for pos in seed_positions:
+        seed = catalog.df.iloc[pos]
+        match_pool = catalog.candidate_pool(
+            seed["gender"], CATEGORY_COMPAT.get(seed["articleType"], []), exclude=pos
+        )
+        bundle_pool = catalog.candidate_pool(seed["gender"], exclude=pos)
+        cases.append((
+            matcher._score_candidates(catalog, seed, match_pool)[0],
+            matcher._score_candidates(catalog, seed, bundle_pool)[0],
+        ))
+
+    k = NUM_MATCHES * 3
+    for match_scores, _ in cases:
+        expected = np.argsort(-match_scores, kind="stable")[:k]
+        assert (top_k(match_scores, k) == expected).all()
+
+    rows = [
+        ("matches: full sort",  _timeit(lambda c: np.argsort(-c[0], kind="stable")[:k], cases)),
+        ("matches: top-k",      _timeit(lambda c: top_k(c[0], k), cases)),
+        ("bundle: full sort",   _timeit(lambda c: np.argsort(-c[1], kind="stable")[0], cases)),
+        ("bundle: top-1",       _timeit(lambda c: np.argmax(c[1]), cases)),
+    ]
+    ids = catalog.df["id"].to_numpy()[seed_positions]
+    rows.append(("get_matches (end to end)",
+                 _timeit(lambda i: matcher.get_matches(i, NUM_MATCHES), ids)))
+    rows.append(("get_outfit_bundle (end to end)",
+                 _timeit(lambda i: matcher.get_outfit_bundle(i, 4), ids)))
+
+    print(f"\n{num_items:,} items — mean over {NUM_SEEDS} seeds")
+    for label, ms in rows:
+        print(f"  {label:<32} {ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [40_000, 1_000_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,49 @@
+"""
+benchmarks/synthetic_catalog.py
+-------------------------------
+Synthetic Vinted-style catalogs of any size, with the same columns and
+value vocabularies as data/vinted_catalog.csv, for benchmarking the
+matching engine beyond the Kaggle snapshot.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matching_engine import ARTICLE_ROLES, COLOUR_COMPAT, SEASON_COMPAT, USAGE_COMPAT
+
+GENDERS = ["Men", "Women", "Unisex", "Boys", "Girls"]
+GENDER_WEIGHTS = [0.45, 0.4, 0.07, 0.04, 0.04]
+MASTER_CATEGORIES = ["Apparel", "Accessories", "Footwear"]
+CONDITIONS = ["New", "Like new", "Good", "Fair"]
+
+
+def make_catalog(num_items, seed=0):
+    """Return a prepared (cleaned) synthetic catalog frame with num_items rows."""
+    rng = np.random.default_rng(seed)
+    articles = np.array(list(ARTICLE_ROLES))
+    colours = np.array(list(COLOUR_COMPAT))
+    article_idx = rng.integers(len(articles), size=num_items)
+    colour_idx = rng.integers(len(colours), size=num_items)
+    names = np.char.add(
+        np.char.add(colours[colour_idx], " "),
+        np.char.add(articles[article_idx], np.char.mod(" %d", np.arange(num_items))),
+    )
+    return pd.DataFrame({
+        "id":                 np.arange(1, num_items + 1),
+        "gender":             rng.choice(GENDERS, size=num_items, p=GENDER_WEIGHTS),
+        "masterCategory":     rng.choice(MASTER_CATEGORIES, size=num_items),
+        "subCategory":        "Misc",
+        "articleType":        articles[article_idx],
+        "baseColour":         colours[colour_idx],
+        "season":             rng.choice(list(SEASON_COMPAT), size=num_items),
+        "year":               rng.integers(2010, 2019, size=num_items),
+        "usage":              rng.choice(list(USAGE_COMPAT), size=num_items),
+        "productDisplayName": names.tolist(),
+        "seller":             np.char.mod("User%d", rng.integers(1000, 1000 + max(num_items // 5, 10), size=num_items)),
+        "price":              rng.integers(5, 151, size=num_items),
+        "condition":          rng.choice(CONDITIONS, size=num_items),
+    })
@@ -0,0 +1,268 @@
+"""
+catalog_index.py
+----------------
+Search structures built once per Catalog, so the browse page filters by
+looking up posting lists instead of scanning every row on each rerun.
+
+SearchIndex: token inverted index over product names. A query matches the
+items containing every query word (AND), where each word also matches
+longer tokens it is a prefix of ("jean" finds "Jeans"). Results are ranked
+by how rare and how exactly-matched their words are.
+
+FacetIndex: one packed bitmap per value of each facet column (gender,
+category, ...). Browse filters AND the selected values' bitmaps together,
+and the dropdowns get per-value counts from the same bitmaps.
+
+Both are built once, but follow incremental catalog updates: new names go
+into a second, small SearchIndex, and FacetIndex.updated appends bitmap
+bits for new rows and masks out removed ones.
+"""
+
+import re
+import sys
+from bisect import bisect_left
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# A prefix hit counts for less than the exact word
+PREFIX_WEIGHT = 0.6
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of text (non-strings have none)."""
+    if not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Inverted index from token to the sorted row positions containing it,
+    stored as one flat postings array (CSR style) over a sorted vocabulary.
+    """
+
+    def __init__(self, texts):
+        token_ids = {}
+        pair_tokens, pair_rows = [], []
+        for row, text in enumerate(texts):
+            for token in set(tokenize(text)):
+                pair_tokens.append(token_ids.setdefault(token, len(token_ids)))
+                pair_rows.append(row)
+
+        # Renumber tokens in sorted order so prefixes are contiguous ranges
+        self.vocab = sorted(token_ids)
+        rank = np.empty(len(token_ids), dtype=np.int64)
+        rank[[token_ids[t] for t in self.vocab]] = np.arange(len(self.vocab))
+        pair_tokens = rank[np.asarray(pair_tokens, dtype=np.int64)]
+        pair_rows = np.asarray(pair_rows, dtype=np.int32)
+
+        order = np.lexsort((pair_rows, pair_tokens))
+        self.postings = pair_rows[order]
+        counts = np.bincount(pair_tokens, minlength=len(self.vocab))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.num_rows = len(texts)
+
+        # Rarer tokens are worth more
+        self.idf = np.log1p(self.num_rows / np.maximum(counts, 1))
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def _term_matches(self, term):
+        """(rows, weights) of the items matching one query word, rows sorted."""
+        start = bisect_left(self.vocab, term)
+        stop = bisect_left(self.vocab, term + "\uffff", lo=start)
+        if start == stop:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        rows, weights = [], []
+        for t in range(start, stop):
+            lo, hi = self.offsets[t], self.offsets[t + 1]
+            weight = self.idf[t] * (1.0 if self.vocab[t] == term else PREFIX_WEIGHT)
+            rows.append(self.postings[lo:hi])
+            weights.append(np.full(hi - lo, weight))
+        if len(rows) == 1:
+            return rows[0], weights[0]
+
+        # A row can hold several tokens with this prefix — keep its best
+        rows, weights = np.concatenate(rows), np.concatenate(weights)
+        order = np.lexsort((-weights, rows))
+        rows, weights = rows[order], weights[order]
+        first = np.concatenate([[True], rows[1:] != rows[:-1]])
+        return rows[first], weights[first]
+
+    def search(self, query):
+        """
+        Row positions of the items matching every word of query, best
+        first (ties keep catalog order). A query without words matches
+        nothing.
+        """
+        rows, scores = self.matches(query)
+        return rows[np.argsort(-scores, kind="stable")]
+
+    def matches(self, query):
+        """(rows, scores) of the items matching query, in row order."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        rows, scores = None, None
+        for term in terms:
+            term_rows, term_weights = self._term_matches(term)
+            if rows is None:
+                rows, scores = term_rows, term_weights
+            else:
+                rows, left, right = np.intersect1d(
+                    rows, term_rows, assume_unique=True, return_indices=True
+                )
+                scores = scores[left] + term_weights[right]
+            if len(rows) == 0:
+                break
+        return rows, scores
+
+    def nbytes(self):
+        """Approximate size of the postings, offsets, idf and vocabulary."""
+        return int(self.postings.nbytes + self.offsets.nbytes + self.idf.nbytes
+                   + sum(sys.getsizeof(t) for t in self.vocab))
+
+
+def _append_bits(bitmap, num_rows, bits):
+    """
+    Packed bitmap over num_rows rows (None: all clear) with bits appended
+    for the rows after them. Only the last, partly used byte is repacked.
+    """
+    full = num_rows // 8
+    if bitmap is None:
+        head = np.zeros(full, dtype=np.uint8)
+        partial = np.zeros(num_rows % 8, dtype=np.uint8)
+    else:
+        head = bitmap[:full]
+        partial = np.unpackbits(bitmap[full:full + 1], count=num_rows % 8)
+    tail = np.packbits(np.concatenate([partial, np.asarray(bits, dtype=np.uint8)]))
+    return np.concatenate([head, tail])
+
+
+class FacetIndex:
+    """
+    Packed row bitmaps (np.packbits, one bit per catalog row) for every
+    value of the given categorical columns.
+    """
+
+    def __init__(self, df, columns):
+        self.num_rows = len(df)
+        # Bitmap of the rows still listed, or None when all of them are
+        self.live = None
+        self.bitmaps = {}
+        for col in columns:
+            codes = df[col].cat.codes.to_numpy()
+            present = np.flatnonzero(np.bincount(codes[codes >= 0],
+                                                 minlength=len(df[col].cat.categories)))
+            self.bitmaps[col] = {
+                df[col].cat.categories[k]: np.packbits(codes == k) for k in present
+            }
+
+    def updated(self, df, dead=()):
+        """
+        A copy covering df — the frame this index was built from with rows
+        appended — where the rows at the dead positions match no filter.
+        Existing bitmap bytes are copied, not recomputed.
+        """
+        start = self.num_rows
+        index = FacetIndex.__new__(FacetIndex)
+        index.num_rows = len(df)
+        index.bitmaps = {}
+        for col, bitmaps in self.bitmaps.items():
+            categories = df[col].cat.categories
+            codes = df[col].cat.codes.to_numpy()[start:]
+            values = set(bitmaps) | set(categories[np.unique(codes[codes >= 0])])
+            index.bitmaps[col] = {
+                value: _append_bits(bitmaps.get(value), start, codes == categories.get_loc(value))
+                for value in values
+            }
+
+        dead = np.asarray(dead, dtype=np.intp)
+        index.live = self.live
+        if index.live is not None or len(dead):
+            live = self.live if self.live is not None else np.packbits(np.ones(start, dtype=bool))
+            live = _append_bits(live, start, np.ones(len(df) - start, dtype=bool))
+            np.bitwise_and.at(live, dead >> 3, ~(0x80 >> (dead & 7)).astype(np.uint8))
+            index.live = live
+        return index
+
+    def values(self, column):
+        """Sorted values of column that occur in the catalog."""
+        return sorted(self.bitmaps[column])
+
+    def select(self, filters):
+        """
+        Bitmap of the live rows matching every {column: value} in filters,
+        or None when there are no filters and no removed rows (every row
+        matches).
+        """
+        selected = self.live
+        for col, value in filters.items():
+            bitmap = self.bitmaps[col].get(value)
+            if bitmap is None:
+                bitmap = np.zeros((self.num_rows + 7) // 8, dtype=np.uint8)
+            selected = bitmap if selected is None else selected & bitmap
+        return selected
+
+    def filter(self, filters, positions=None):
+        """
+        Row positions matching filters: all of them in catalog order, or
+        only those among positions (order kept) when given.
+        """
+        selected = self.select(filters)
+        if selected is None:
+            return np.arange(self.num_rows) if positions is None else positions
+        if positions is None:
+            return np.flatnonzero(np.unpackbits(selected, count=self.num_rows))
+        # Test just the given rows' bits (packbits is big-endian within a byte)
+        positions = np.asarray(positions)
+        bits = (selected[positions >> 3] >> (7 - (positions & 7)).astype(np.uint8)) & 1
+        return positions[bits.astype(bool)]
+
+    def page(self, filters, offset, limit):
+        """
+        (positions, total): the rows matching filters from the offset-th
+        match on, at most limit of them, in catalog order. Only the bitmap
+        bytes around the page are unpacked, so deep pages cost the same as
+        the first.
+        """
+        selected = self.select(filters)
+        if selected is None:
+            return np.arange(offset, min(offset + limit, self.num_rows)), self.num_rows
+
+        # Matches up to and including each bitmap byte
+        cumulative = np.cumsum(np.bitwise_count(selected), dtype=np.int64)
+        total = int(cumulative[-1]) if len(cumulative) else 0
+        if offset >= total or limit <= 0:
+            return np.empty(0, dtype=np.intp), total
+
+        first = int(np.searchsorted(cumulative, offset, side="right"))
+        last = int(np.searchsorted(cumulative, min(offset + limit, total), side="left"))
+        before = int(cumulative[first - 1]) if first else 0
+        window = np.flatnonzero(np.unpackbits(selected[first:last + 1])) + first * 8
+        skip = offset - before
+        return window[skip:skip + limit], total
+
+    def counts(self, column, filters=None):
+        """
+        {value: number of rows} for each value of column, among the rows
+        matching filters (filters on column itself are ignored).
+        """
+        others = {c: v for c, v in (filters or {}).items() if c != column}
+        selected = self.select(others)
+        if selected is None:
+            return {value: int(np.bitwise_count(bitmap).sum())
+                    for value, bitmap in self.bitmaps[column].items()}
+        return {value: int(np.bitwise_count(bitmap & selected).sum())
+                for value, bitmap in self.bitmaps[column].items()}
+
+    def nbytes(self):
+        """Total size of the bitmaps."""
+        live = self.live.nbytes if self.live is not None else 0
+        return live + sum(b.nbytes for col in self.bitmaps.values() for b in col.values())
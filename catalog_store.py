@@ -0,0 +1,182 @@
+"""
+catalog_store.py
+----------------
+Preprocessed columnar catalog artifact for fast matcher cold starts.
+
+setup_data.py cleans the catalog once (defaults filled, non-useful
+categories dropped) and writes it as one .npy file per column, with
+categorical columns stored as small integer codes plus a vocabulary.
+OutfitMatcher loads these files at startup instead of parsing and
+cleaning the CSV, and falls back to the CSV when the artifact is missing
+or older than it. Numeric columns are memory-mapped; categorical codes
+are copied into pandas categoricals (they are 1-2 bytes per row) and text
+columns are read into memory.
+
+Layout:
+    data/vinted_catalog_columns/
+        meta.json              # current build, source stamp, column specs
+        build-<ns>/<col>.npy   # numeric columns and categorical codes
+        build-<ns>/<col>.txt   # free-text columns, one value per "\n"-ended line
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+FORMAT_VERSION = 1
+
+# Only these master categories are useful for outfits (the rest is noise)
+USEFUL_CATEGORIES = ["Apparel", "Accessories", "Footwear"]
+
+# Defaults for missing values
+FILL_DEFAULTS = {
+    "usage":      "Casual",
+    "season":     "Fall",    # Fall = wildcard
+    "baseColour": "Multi",
+    "gender":     "Unisex",
+}
+
+# Low-cardinality string columns, stored as integer codes + vocabulary
+CATEGORICAL_COLUMNS = [
+    "gender", "masterCategory", "subCategory", "articleType",
+    "baseColour", "season", "usage", "seller", "condition",
+]
+
+
+def artifact_path_for(catalog_path):
+    """Default artifact directory for a catalog CSV."""
+    return os.path.splitext(catalog_path)[0] + "_columns"
+
+
+def prepare_catalog(df):
+    """Fill missing values with sensible defaults and drop non-useful categories."""
+    df = df.fillna(FILL_DEFAULTS)
+    df = df[df["masterCategory"].isin(USEFUL_CATEGORIES)]
+    return df.reset_index(drop=True)
+
+
+def source_stamp(path):
+    """Identify a version of a source file (e.g. the CSV) by its mtime and size."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def new_build_dir(artifact_path):
+    """Create a fresh build directory inside artifact_path. Returns (build, dir)."""
+    build = f"build-{time.time_ns()}"
+    build_dir = os.path.join(artifact_path, build)
+    os.makedirs(build_dir)
+    return build, build_dir
+
+
+def publish_build(artifact_path, meta):
+    """
+    Atomically point artifact_path/meta.json at meta["build"] and delete
+    older builds. Processes still mapping an old build keep their pages.
+    """
+    tmp_path = os.path.join(artifact_path, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(artifact_path, "meta.json"))
+
+    for entry in os.listdir(artifact_path):
+        if entry.startswith("build-") and entry != meta["build"]:
+            shutil.rmtree(os.path.join(artifact_path, entry), ignore_errors=True)
+
+
+def read_meta(artifact_path):
+    """Return the parsed meta.json of an artifact, or None if unreadable."""
+    try:
+        with open(os.path.join(artifact_path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_catalog_artifact(df, artifact_path, source_path=None):
+    """
+    Write a prepared catalog frame as a columnar artifact.
+
+    Each write goes to a fresh build directory and meta.json is swapped in
+    last, so processes that still map the previous build are unaffected.
+    Returns the new build name.
+    """
+    build, build_dir = new_build_dir(artifact_path)
+
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            cat = pd.Categorical(series)
+            np.save(os.path.join(build_dir, f"{col}.npy"), cat.codes)
+            columns.append({
+                "name": col,
+                "kind": "categorical",
+                "categories": cat.categories.tolist(),
+            })
+        elif pd.api.types.is_numeric_dtype(series):
+            np.save(os.path.join(build_dir, f"{col}.npy"), series.to_numpy())
+            columns.append({"name": col, "kind": "numeric"})
+        else:
+            values = series.fillna("").astype(str).str.replace("\n", " ")
+            # newline="": written and read back byte for byte, so a "\r" in
+            # a name is not turned into a line break
+            with open(os.path.join(build_dir, f"{col}.txt"), "w", encoding="utf-8",
+                      newline="") as f:
+                f.write("\n".join(values))
+            columns.append({"name": col, "kind": "text"})
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "build":          build,
+        "rows":           len(df),
+        "source":         source_stamp(source_path) if source_path else None,
+        "columns":        columns,
+    }
+    publish_build(artifact_path, meta)
+    return build
+
+
+def read_catalog_artifact(artifact_path, source_path=None):
+    """
+    Load the catalog frame from an artifact, memory-mapping its numeric
+    columns (categorical codes are copied by pd.Categorical.from_codes).
+    Returns None if the artifact is missing, unreadable, or older than
+    source_path.
+    """
+    meta = read_meta(artifact_path)
+    if meta is None or meta.get("format_version") != FORMAT_VERSION:
+        return None
+
+    if source_path is not None:
+        stamp = source_stamp(source_path)
+        if stamp is not None and stamp != meta.get("source"):
+            return None
+
+    build_dir = os.path.join(artifact_path, meta["build"])
+    data = {}
+    try:
+        for spec in meta["columns"]:
+            name = spec["name"]
+            if spec["kind"] == "categorical":
+                codes = np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+                data[name] = pd.Categorical.from_codes(codes, categories=spec["categories"])
+            elif spec["kind"] == "numeric":
+                data[name] = np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+            else:
+                with open(os.path.join(build_dir, f"{name}.txt"), encoding="utf-8",
+                          newline="") as f:
+                    data[name] = f.read().split("\n") if meta["rows"] else []
+    except OSError:
+        # A concurrent rebuild removed this build — let the caller fall back
+        return None
+
+    return pd.DataFrame(data, copy=False)
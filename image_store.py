@@ -0,0 +1,274 @@
+"""
+image_store.py
+--------------
+Thumbnails for the browse grid and item pages.
+
+The catalog images in data/images are full-size product photos. Decoding
+them on every card of every rerun is the slowest part of the browse page, so
+an offline stage (run by setup_data.py, or directly) writes downscaled JPEGs
+per display size, and ImageStore serves their encoded bytes from a bounded
+in-memory cache — a grid render decodes nothing at full resolution.
+
+Optionally, the thumbnails are also packed into one archive per size with
+a sorted id -> (offset, length) index. ImageStore then reads every image
+through a single memory-mapped file instead of one open() per image, which
+matters on network-attached volumes. Loose files remain the fallback for
+images added after the last pack.
+
+Layout:
+    data/thumbnails/grid/<id>.jpg     # browse grid, matches, bundle pieces
+    data/thumbnails/detail/<id>.jpg   # item detail page
+    data/image_packs/
+        meta.json
+        build-<ns>/<size>.pack        # concatenated JPEG bytes
+        build-<ns>/<size>_index.npy   # rows of (id, offset, length), by id
+
+Run with:  python image_store.py [--force] [--pack]
+"""
+
+import argparse
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from catalog_store import new_build_dir, publish_build, read_meta
+from result_cache import ResultCache
+
+
+IMAGE_DIR = "data/images"
+THUMBNAIL_DIR = "data/thumbnails"
+IMAGE_PACK_DIR = "data/image_packs"
+PACK_FORMAT_VERSION = 1
+
+# Bounding box (width, height) per display size; aspect ratio is kept
+THUMBNAIL_SIZES = {
+    "grid":   (240, 320),
+    "detail": (600, 800),
+}
+THUMBNAIL_QUALITY = 85
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _thumbnail_bytes(source_path, size):
+    """Decode source_path at reduced scale and return it as JPEG bytes."""
+    box = THUMBNAIL_SIZES[size]
+    with Image.open(source_path) as img:
+        # Let the JPEG decoder skip detail we are about to throw away
+        img.draft("RGB", box)
+        img = img.convert("RGB")
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _write_thumbnail(source_path, thumb_path, size):
+    """Write one thumbnail, atomically. Returns True if it was written."""
+    try:
+        data = _thumbnail_bytes(source_path, size)
+    except (OSError, ValueError):
+        return False
+    tmp_path = thumb_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, thumb_path)
+    return True
+
+
+def build_thumbnails(image_dir=IMAGE_DIR, thumb_dir=THUMBNAIL_DIR, sizes=None,
+                     force=False, workers=None):
+    """
+    Generate thumbnails for every image in image_dir. Thumbnails newer than
+    their source are kept unless force=True.
+
+    Returns {"images": ..., "written": ..., "skipped": ..., "failed": ...}.
+    """
+    sizes = list(THUMBNAIL_SIZES) if sizes is None else sizes
+    try:
+        names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith(".jpg"))
+    except OSError:
+        names = []
+
+    jobs = []
+    skipped = 0
+    for size in sizes:
+        os.makedirs(os.path.join(thumb_dir, size), exist_ok=True)
+        for name in names:
+            source_path = os.path.join(image_dir, name)
+            thumb_path = os.path.join(thumb_dir, size, name)
+            if not force and _is_fresh(thumb_path, source_path):
+                skipped += 1
+                continue
+            jobs.append((source_path, thumb_path, size))
+
+    # Pillow releases the GIL while decoding and resizing
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(lambda job: _write_thumbnail(*job), jobs))
+
+    return {
+        "images":  len(names),
+        "written": written,
+        "skipped": skipped,
+        "failed":  len(jobs) - written,
+    }
+
+
+def _is_fresh(thumb_path, source_path):
+    """Whether thumb_path exists and is at least as new as source_path."""
+    try:
+        return os.stat(thumb_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def build_image_packs(image_dir=IMAGE_DIR, thumb_dir=THUMBNAIL_DIR,
+                      pack_dir=IMAGE_PACK_DIR, sizes=None):
+    """
+    Pack every image's thumbnails into one archive per size (thumbnails
+    that were not prebuilt are made on the fly). Returns the new build name.
+    """
+    sizes = list(THUMBNAIL_SIZES) if sizes is None else sizes
+    try:
+        ids = sorted(int(n[:-4]) for n in os.listdir(image_dir)
+                     if n.lower().endswith(".jpg") and n[:-4].isdigit())
+    except OSError:
+        ids = []
+
+    os.makedirs(pack_dir, exist_ok=True)
+    build, build_dir = new_build_dir(pack_dir)
+    loose = ImageStore(image_dir, thumb_dir, pack_dir=None, max_bytes=0)
+    for size in sizes:
+        index = np.zeros((len(ids), 3), dtype=np.int64)
+        offset = 0
+        with open(os.path.join(build_dir, f"{size}.pack"), "wb") as f:
+            for row, item_id in enumerate(ids):
+                data = loose._load_file(item_id, size)
+                f.write(data)
+                index[row] = item_id, offset, len(data)
+                offset += len(data)
+        # Images that could not be read are left out of the index
+        np.save(os.path.join(build_dir, f"{size}_index.npy"), index[index[:, 2] > 0])
+
+    publish_build(pack_dir, {
+        "format_version": PACK_FORMAT_VERSION,
+        "build":          build,
+        "sizes":          sizes,
+        "images":         len(ids),
+    })
+    return build
+
+
+class _ImagePack:
+    """One size's packed archive: a memory-mapped blob plus its id index."""
+
+    def __init__(self, pack_path, index_path):
+        index = np.load(index_path)
+        self.ids = np.ascontiguousarray(index[:, 0])
+        self.offsets = index[:, 1]
+        self.lengths = index[:, 2]
+        # np.memmap can't map an empty file
+        self.blob = np.memmap(pack_path, dtype=np.uint8, mode="r") if len(index) else None
+
+    def get(self, item_id):
+        """The packed bytes for item_id, or None if it is not in the pack."""
+        row = int(np.searchsorted(self.ids, item_id))
+        if row == len(self.ids) or self.ids[row] != item_id:
+            return None
+        start = int(self.offsets[row])
+        return self.blob[start:start + int(self.lengths[row])].tobytes()
+
+
+def _open_packs(pack_dir):
+    """{size: _ImagePack} for the current pack build, or {} if there is none."""
+    meta = read_meta(pack_dir) if pack_dir else None
+    if meta is None or meta.get("format_version") != PACK_FORMAT_VERSION:
+        return {}
+    build_dir = os.path.join(pack_dir, meta["build"])
+    try:
+        return {
+            size: _ImagePack(os.path.join(build_dir, f"{size}.pack"),
+                             os.path.join(build_dir, f"{size}_index.npy"))
+            for size in meta["sizes"]
+        }
+    except (OSError, ValueError):
+        return {}
+
+
+class ImageStore:
+    """
+    Serves encoded thumbnail bytes by item id, through a bounded byte cache.
+    Reads from the packed archive when there is one, else from loose
+    thumbnails, else downscales the original. Safe to share between
+    sessions (e.g. via st.cache_resource).
+    """
+
+    def __init__(self, image_dir=IMAGE_DIR, thumb_dir=THUMBNAIL_DIR, pack_dir=IMAGE_PACK_DIR,
+                 max_bytes=DEFAULT_CACHE_BYTES):
+        self.image_dir = image_dir
+        self.thumb_dir = thumb_dir
+        self.packs = _open_packs(pack_dir)
+        self.cache = ResultCache(max_entries=100_000, ttl=None, max_bytes=max_bytes)
+
+    def get(self, item_id, size="grid"):
+        """JPEG bytes of item_id's image at the given size, or None if it has none."""
+        key = (int(item_id), size)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._load(*key)
+            # Missing images are cached as b"" so they aren't looked up again
+            self.cache.put(key, data)
+        return data or None
+
+    def prewarm(self, item_ids, size="grid"):
+        """Load the given items' images into the cache ahead of their first view."""
+        for item_id in item_ids:
+            self.get(item_id, size)
+
+    def _load(self, item_id, size):
+        """Read the image from the pack, else from loose files."""
+        pack = self.packs.get(size)
+        if pack is not None:
+            data = pack.get(item_id)
+            if data is not None:
+                return data
+        return self._load_file(item_id, size)
+
+    def _load_file(self, item_id, size):
+        """Read the prebuilt thumbnail, or make one from the original."""
+        name = f"{item_id}.jpg"
+        try:
+            with open(os.path.join(self.thumb_dir, size, name), "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        try:
+            return _thumbnail_bytes(os.path.join(self.image_dir, name), size)
+        except (OSError, ValueError):
+            return b""
+
+    def stats(self):
+        """Byte cache counters (see ResultCache.stats)."""
+        return self.cache.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate catalog thumbnails.")
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--out", default=THUMBNAIL_DIR)
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild thumbnails even if they are up to date")
+    parser.add_argument("--pack", action="store_true",
+                        help="also pack the thumbnails into memory-mapped archives")
+    parser.add_argument("--pack-dir", default=IMAGE_PACK_DIR)
+    args = parser.parse_args()
+
+    stats = build_thumbnails(args.images, args.out, force=args.force)
+    print(f"Thumbnails for {stats['images']:,} images: {stats['written']:,} written, "
+          f"{stats['skipped']:,} up to date, {stats['failed']:,} failed.")
+    if args.pack:
+        build = build_image_packs(args.images, args.out, args.pack_dir)
+        print(f"Packed thumbnails into {args.pack_dir}/{build}.")
@@ -0,0 +1,326 @@
+"""
+item_parser.py
+--------------
+Turns a free-text item description ("navy slim jeans for men") into the
+catalog attributes the matcher needs.
+
+Parsing goes down a chain, cheapest first:
+    1. a local keyword parser — offline and instant; when it finds the item
+       type, colour and gender unambiguously, its answer is used as is
+    2. the result cache — normalized description -> attributes, in memory
+       and on disk with a TTL, so a repeated description costs nothing
+    3. the LLM (Cohere), through one reused client with a timeout
+
+The LLM is any callable prompt -> text, so the chain can run against a
+local stub instead of Cohere — or CohereLLM can point at a local mock
+endpoint via base_url. parse_async runs the LLM step on a small worker
+pool so callers (the upload page) don't block on it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from result_cache import ResultCache
+
+
+ARTICLE_TYPES = sorted([
+    "Tshirts", "Shirts", "Casual Shoes", "Watches", "Sports Shoes",
+    "Kurtas", "Tops", "Handbags", "Heels", "Sunglasses", "Wallets",
+    "Flip Flops", "Sandals", "Belts", "Backpacks", "Socks",
+    "Formal Shoes", "Jeans", "Shorts", "Trousers", "Jackets",
+    "Sweaters", "Sweatshirts", "Blazers", "Dresses", "Skirts",
+    "Leggings", "Track Pants", "Sports Sandals", "Capris",
+    "Earrings", "Necklace and Chains", "Bracelet", "Scarves", "Caps",
+])
+COLOURS   = sorted(["Black", "White", "Blue", "Brown", "Grey", "Red", "Green", "Pink", "Navy Blue", "Purple", "Silver", "Yellow", "Beige", "Gold", "Maroon", "Orange", "Olive", "Multi", "Cream"])
+OCCASIONS = ["Casual", "Formal", "Sports", "Ethnic", "Smart Casual", "Party", "Travel"]
+SEASONS   = ["Summer", "Fall", "Winter", "Spring"]
+GENDERS   = ["Men", "Women", "Unisex"]
+
+# Allowed values per parsed field
+FIELD_VALUES = {
+    "articleType": ARTICLE_TYPES,
+    "baseColour":  COLOURS,
+    "usage":       OCCASIONS,
+    "season":      SEASONS,
+    "gender":      GENDERS,
+}
+
+COHERE_MODEL = "command-r-plus-08-2024"
+LLM_TIMEOUT = 20           # seconds
+CACHE_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_CACHE_DIR = "data/parse_cache"
+
+# Bump when the prompt changes, so cached answers to the old one are ignored
+PROMPT_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# KEYWORD PARSER
+# Phrases (lowercase, matched on word boundaries) -> field value, on top of
+# each value's own name and its singular. Longer phrases win ("navy blue"
+# over "blue", "sports shoes" over "shoes").
+# ---------------------------------------------------------------------------
+KEYWORD_SYNONYMS = {
+    "articleType": {
+        "t-shirt": "Tshirts", "t shirt": "Tshirts", "tee": "Tshirts", "tees": "Tshirts",
+        "shirt": "Shirts", "sneakers": "Casual Shoes", "sneaker": "Casual Shoes",
+        "trainers": "Sports Shoes", "running shoes": "Sports Shoes",
+        "watch": "Watches", "kurta": "Kurtas", "top": "Tops", "blouse": "Tops",
+        "handbag": "Handbags", "purse": "Handbags", "bag": "Handbags",
+        "heel": "Heels", "pumps": "Heels", "sunglass": "Sunglasses", "shades": "Sunglasses",
+        "wallet": "Wallets", "flip flop": "Flip Flops", "flip-flops": "Flip Flops",
+        "sandal": "Sandals", "belt": "Belts", "backpack": "Backpacks", "rucksack": "Backpacks",
+        "sock": "Socks", "oxfords": "Formal Shoes", "loafers": "Formal Shoes",
+        "jean": "Jeans", "denim": "Jeans", "short": "Shorts", "trouser": "Trousers",
+        "pants": "Trousers", "chinos": "Trousers", "jacket": "Jackets", "coat": "Jackets",
+        "sweater": "Sweaters", "jumper": "Sweaters", "pullover": "Sweaters",
+        "sweatshirt": "Sweatshirts", "hoodie": "Sweatshirts", "blazer": "Blazers",
+        "dress": "Dresses", "skirt": "Skirts", "legging": "Leggings",
+        "joggers": "Track Pants", "track pant": "Track Pants", "trackpants": "Track Pants",
+        "capri": "Capris", "earring": "Earrings", "necklace": "Necklace and Chains",
+        "chain": "Necklace and Chains", "bracelets": "Bracelet", "scarf": "Scarves",
+        "cap": "Caps", "hat": "Caps",
+    },
+    "baseColour": {
+        "navy": "Navy Blue", "dark blue": "Navy Blue", "gray": "Grey", "burgundy": "Maroon",
+        "khaki": "Olive", "tan": "Beige", "off-white": "Cream", "off white": "Cream",
+        "ivory": "Cream", "multicolour": "Multi", "multicolor": "Multi", "golden": "Gold",
+    },
+    "usage": {
+        "office": "Formal", "work": "Formal", "business": "Formal",
+        "sport": "Sports", "gym": "Sports", "running": "Sports", "workout": "Sports",
+        "smart-casual": "Smart Casual", "wedding": "Party", "evening": "Party",
+        "holiday": "Travel", "vacation": "Travel", "everyday": "Casual",
+    },
+    "season": {"autumn": "Fall"},
+    "gender": {
+        "man": "Men", "mens": "Men", "men's": "Men", "male": "Men", "boys": "Men",
+        "woman": "Women", "womens": "Women", "women's": "Women", "female": "Women",
+        "ladies": "Women", "girls": "Women",
+    },
+}
+
+
+def normalize_description(text):
+    """Lowercase, single-spaced description (the cache key)."""
+    return " ".join(str(text).lower().split())
+
+
+def _keyword_patterns():
+    """[(field, compiled pattern, value)] with longer phrases first."""
+    phrases = []
+    for field, values in FIELD_VALUES.items():
+        for value in values:
+            phrases.append((field, value.lower(), value))
+            if value.lower().endswith("s"):
+                phrases.append((field, value.lower()[:-1], value))
+        for phrase, value in KEYWORD_SYNONYMS.get(field, {}).items():
+            phrases.append((field, phrase, value))
+    phrases.sort(key=lambda p: -len(p[1]))
+    return [
+        (field, re.compile(r"(?<![\w'-])" + re.escape(phrase) + r"(?![\w'-])"), value)
+        for field, phrase, value in phrases
+    ]
+
+
+_KEYWORD_PATTERNS = _keyword_patterns()
+
+
+def keyword_parse(description):
+    """
+    Offline parse by keyword matching. Returns ({field: value} for the
+    fields found, confident), where confident means the item type, colour
+    and gender were each found with a single unambiguous value (a missing
+    gender would otherwise default to Unisex, which matches every gender).
+    """
+    text = normalize_description(description)
+    found = {}
+    for field, pattern, value in _KEYWORD_PATTERNS:
+        if pattern.search(text):
+            found.setdefault(field, set()).add(value)
+            # Don't let "blue" also count once "navy blue" matched
+            text = pattern.sub(" ", text)
+
+    fields = {f: next(iter(v)) for f, v in found.items() if len(v) == 1}
+    confident = all(len(found.get(f, ())) == 1 for f in ("articleType", "baseColour", "gender"))
+    return fields, confident
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+def build_prompt(description):
+    """The classification prompt for one description."""
+    return f"""You are a fashion item classifier. Extract clothing attributes from this description.
+
+Description: "{description}"
+
+Return ONLY a JSON object with exactly these keys (no explanation, no markdown, just JSON):
+{{
+  "articleType": one of {ARTICLE_TYPES},
+  "baseColour": one of {COLOURS},
+  "usage": one of {OCCASIONS},
+  "season": one of {SEASONS},
+  "gender": one of {GENDERS}
+}}
+
+If unsure about a field, pick the closest match from the allowed values. Never return null."""
+
+
+def parse_llm_reply(raw):
+    """Parse the model's JSON reply, keeping only allowed field values."""
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    reply = json.loads(raw.strip())
+
+    fields = {}
+    for field, values in FIELD_VALUES.items():
+        by_lower = {v.lower(): v for v in values}
+        value = by_lower.get(str(reply.get(field, "")).strip().lower())
+        if value is not None:
+            fields[field] = value
+    return fields
+
+
+class CohereLLM:
+    """
+    Callable prompt -> reply text backed by Cohere chat. One client (and
+    its HTTP connection pool) is reused for every call.
+    """
+
+    def __init__(self, api_key, model=COHERE_MODEL, timeout=LLM_TIMEOUT, base_url=None):
+        import cohere
+
+        self.model = model
+        self.client = cohere.ClientV2(api_key=api_key, base_url=base_url,
+                                      timeout=timeout, max_retries=1)
+
+    def __call__(self, prompt):
+        response = self.client.chat(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.message.content[0].text
+
+
+# ---------------------------------------------------------------------------
+# PARSER
+# ---------------------------------------------------------------------------
+class ItemParser:
+    """
+    Description -> attributes through the keyword / cache / LLM chain (see
+    the module docstring). Safe to share between sessions.
+
+    llm: callable prompt -> reply text, or None to parse offline only.
+    """
+
+    def __init__(self, llm=None, cache_dir=DEFAULT_CACHE_DIR, ttl=CACHE_TTL, workers=4):
+        self.llm = llm
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._memory = ResultCache(max_entries=4096, ttl=ttl)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="item-parser")
+
+    def parse(self, description):
+        """
+        Return {field: value, ..., "source": "keywords" | "cache" | "llm"}.
+        Fields the parser could not determine are left out. Raises
+        RuntimeError when there is no LLM and no keyword matched, and
+        re-raises LLM errors when the keywords found no item type.
+        """
+        parsed = self._parse_local(description)
+        if parsed is not None:
+            return parsed
+        return self._parse_llm(description)
+
+    def parse_async(self, description):
+        """
+        Start parse(description) and return a Future for its result.
+        Offline and cached answers come back already completed; only the
+        LLM call runs on the worker pool.
+        """
+        try:
+            parsed = self._parse_local(description)
+        except Exception as e:
+            parsed = e
+        if parsed is None:
+            return self._pool.submit(self._parse_llm, description)
+
+        future = Future()
+        if isinstance(parsed, Exception):
+            future.set_exception(parsed)
+        else:
+            future.set_result(parsed)
+        return future
+
+    def _parse_local(self, description):
+        """The keyword or cached answer, or None when the LLM is needed."""
+        fields, confident = keyword_parse(description)
+        if confident:
+            return {**fields, "source": "keywords"}
+
+        cached = self._cache_get(self._cache_key(description))
+        if cached is not None:
+            return {**cached, "source": "cache"}
+
+        if self.llm is None:
+            if fields:
+                return {**fields, "source": "keywords"}
+            raise RuntimeError("COHERE_API_KEY is not set. Add it to Streamlit secrets or an environment variable.")
+        return None
+
+    def _parse_llm(self, description):
+        """Ask the LLM, falling back to a partial keyword answer on failure."""
+        fields, _ = keyword_parse(description)
+        key = self._cache_key(description)
+        try:
+            parsed = parse_llm_reply(self.llm(build_prompt(description)))
+        except Exception:
+            # A partial offline answer beats an error
+            if "articleType" in fields:
+                return {**fields, "source": "keywords"}
+            raise
+
+        self._cache_put(key, parsed)
+        return {**parsed, "source": "llm"}
+
+    def _cache_key(self, description):
+        text = f"{PROMPT_VERSION}|{normalize_description(description)}"
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cache_get(self, key):
+        """Cached fields for key (memory, then disk), or None."""
+        fields = self._memory.get(key)
+        if fields is not None or not self.cache_dir:
+            return fields
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.ttl:
+            return None
+        self._memory.put(key, entry["fields"])
+        return entry["fields"]
+
+    def _cache_put(self, key, fields):
+        self._memory.put(key, fields)
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, f"{key}.json")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": time.time(), "fields": fields}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # the disk cache is best effort
@@ -11,10 +11,37 @@ Logic summary:
 - Colour harmony: soft score boost
 - Category compatibility: defines which article types can match together
 - One result per outfit role (top, bottom, shoes, accessory, etc.)
+
+The rule tables below are the defaults; data/matching_rules.json can
+override any of them (see RuleSet).
 """
 
+import argparse
+import copy
+import functools
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
-import random
+
+from catalog_store import (
+    CATEGORICAL_COLUMNS,
+    FILL_DEFAULTS,
+    artifact_path_for,
+    prepare_catalog,
+    read_catalog_artifact,
+    read_meta,
+    source_stamp,
+)
+from catalog_index import FacetIndex, SearchIndex, tokenize
+from result_cache import ResultCache
 
 
 # ---------------------------------------------------------------------------
@@ -284,262 +311,1809 @@ CATEGORY_COMPAT = {
 }
 
 
-class OutfitMatcher:
+# ---------------------------------------------------------------------------
+# SCORING WEIGHTS
+# Soft-score points awarded per satisfied rule, plus a small jitter so
+# results feel less robotic.
+# ---------------------------------------------------------------------------
+COLOUR_SCORE = 30
+USAGE_SCORE = 25
+SEASON_SCORE = 15
+SAME_SELLER_SCORE = 40
+JITTER_MIN, JITTER_MAX = 1, 15
+
+
+# ---------------------------------------------------------------------------
+# MATCH REASONS
+# The scorer records which rules each candidate satisfied as a bitmask;
+# points and explanations are both derived from it.
+# ---------------------------------------------------------------------------
+REASON_COLOUR = 1
+REASON_USAGE = 2
+REASON_SEASON = 4
+REASON_SAME_SELLER = 8
+
+REASON_NAMES = {
+    REASON_COLOUR:      "colour",
+    REASON_USAGE:       "usage",
+    REASON_SEASON:      "season",
+    REASON_SAME_SELLER: "same_seller",
+}
+
+REASON_SCORES = {
+    REASON_COLOUR:      COLOUR_SCORE,
+    REASON_USAGE:       USAGE_SCORE,
+    REASON_SEASON:      SEASON_SCORE,
+    REASON_SAME_SELLER: SAME_SELLER_SCORE,
+}
+
+# Points for every possible reason mask, so scoring is one lookup
+REASON_POINTS = np.array([
+    sum(points for bit, points in REASON_SCORES.items() if mask & bit)
+    for mask in range(16)
+], dtype=np.int64)
+
+# Explanation fragment per reason, in display order (season isn't shown)
+REASON_TEMPLATES = [
+    (REASON_COLOUR,      "Colour harmony ({seed_colour} + {colour})"),
+    (REASON_USAGE,       "{usage} vibe"),
+    (REASON_SAME_SELLER, "Same seller — save on shipping!"),
+]
+
+# "hash": jitter derived from (seed id, candidate id, epoch) — reproducible,
+#         so results can be cached and precomputed
+# "random": a fresh random draw per request (the original behaviour)
+JITTER_MODES = ("hash", "random")
+
+_MASK64 = (1 << 64) - 1
+
+DEFAULT_CATALOG_PATH = "data/vinted_catalog.csv"
+
+# Optional JSON overrides of the rule tables (see RuleSet.load)
+DEFAULT_RULES_PATH = "data/matching_rules.json"
+
+# Seeds agreeing on these share candidate pools and rule scores in batches
+BATCH_GROUP_COLUMNS = ["gender", "articleType", "baseColour", "usage", "season"]
+
+# Columns whose integer codes are used for vectorised scoring
+SCORED_COLUMNS = ["baseColour", "usage", "season", "seller"]
+
+# Rule tables whose values must be in a column's vocabulary even when no
+# catalog item uses them, so seeds with those values still score correctly
+RULE_VOCABULARY = {
+    "baseColour": "colour",
+    "usage":      "usage",
+    "season":     "season",
+}
+
+# Numeric columns stored as 32-bit integers when their values fit
+COMPACT_INT_COLUMNS = ["id", "year", "price"]
+
+# Attributes that describe an item that isn't in the catalog (an uploaded
+# item), enough to match and bundle around it
+VIRTUAL_SEED_FIELDS = ["articleType", "baseColour", "usage", "season", "gender"]
+
+# Browse filters and their dropdown counts (one bitmap per value, so keep
+# high-cardinality columns like seller out)
+FACET_COLUMNS = [
+    "gender", "masterCategory", "subCategory", "articleType",
+    "baseColour", "season", "usage", "condition",
+]
+
+
+# Catalog columns read when assembling results
+MATCH_COLUMNS = [
+    "id", "productDisplayName", "articleType", "subCategory",
+    "baseColour", "seller", "price", "condition",
+]
+BUNDLE_COLUMNS = [
+    "id", "productDisplayName", "articleType", "baseColour", "seller", "price", "condition",
+]
+
+# Incremental updates are folded into a rebuilt catalog once they have
+# appended or removed this share of its rows (and at least COMPACT_MIN_ROWS)
+COMPACT_FRACTION = 0.05
+COMPACT_MIN_ROWS = 1000
+
+
+def encode_catalog(df, rules=None):
     """
-    Matches fashion items to build complementary outfits.
-    Uses rule-based scoring with soft/hard filters.
+    Convert a prepared catalog to its compact in-memory layout: the
+    string attribute columns become categoricals with sorted vocabularies
+    (extended with every value the rule tables mention — the default
+    RuleSet unless rules is given) and integer columns are narrowed to
+    int32. Returns a new frame.
+    """
+    rules = rules if rules is not None else RuleSet()
+    df = df.copy(deep=False)
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = set(df[col].dropna().unique())
+        table = getattr(rules, RULE_VOCABULARY[col]) if col in RULE_VOCABULARY else {}
+        for seed_value, compatible in table.items():
+            values.add(seed_value)
+            values.update(compatible)
+        categories = sorted(values)
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and list(dtype.categories) == categories:
+            continue  # already encoded (e.g. loaded from the columnar artifact)
+        df[col] = pd.Categorical(df[col], categories=categories)
+
+    int32 = np.iinfo(np.int32)
+    for col in COMPACT_INT_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            if len(df) == 0 or int32.min <= df[col].min() and df[col].max() <= int32.max:
+                df[col] = df[col].astype(np.int32)
+    return df
+
+
+def _compat_matrix(rules, vocab, default_self):
     """
+    Turn a {seed value: [compatible values]} rule table into a boolean
+    matrix indexed by [seed code, candidate code].
 
-    def __init__(self, catalog_path="data/vinted_catalog.csv"):
-        self.df = pd.read_csv(catalog_path, on_bad_lines="skip")
+    The matrix has one extra trailing row/column that is always False, so
+    the code -1 (value missing from the vocabulary) never matches anything.
+    """
+    size = len(vocab)
+    matrix = np.zeros((size + 1, size + 1), dtype=bool)
+    for seed_value, seed_code in vocab.items():
+        default = [seed_value] if default_self else []
+        for value in rules.get(seed_value, default):
+            code = vocab.get(value)
+            if code is not None:
+                matrix[seed_code, code] = True
+    return matrix
+
+
+# ---------------------------------------------------------------------------
+# RULE SET
+# The rule tables above, compiled for lookups and checked against the
+# catalog they are used with. Any table can be overridden from a JSON file
+# (see RuleSet.load), so rules change without a code change.
+# ---------------------------------------------------------------------------
+# Table name (in a rules file) -> default table
+RULE_TABLES = {
+    "gender":        GENDER_COMPAT,
+    "colour":        COLOUR_COMPAT,
+    "usage":         USAGE_COMPAT,
+    "season":        SEASON_COMPAT,
+    "category":      CATEGORY_COMPAT,
+    "article_roles": ARTICLE_ROLES,
+}
+
+# Catalog column holding the values each table refers to
+RULE_TABLE_COLUMNS = {
+    "gender":        "gender",
+    "colour":        "baseColour",
+    "usage":         "usage",
+    "season":        "season",
+    "category":      "articleType",
+    "article_roles": "articleType",
+}
+
+
+class RuleSet:
+    """
+    A compiled, read-only set of rule tables. {value: [values]} tables
+    become {value: tuple} (the order decides candidate pool order), with a
+    frozenset per category entry for membership tests, and the role ->
+    article type lookups that bundles use are built once. Catalog turns
+    the colour, usage and season tables into code-indexed matrices.
+    """
+
+    def __init__(self, tables=None, source=None):
+        unknown = set(tables or {}) - set(RULE_TABLES)
+        if unknown:
+            raise ValueError(f"Unknown rule tables: {sorted(unknown)}")
+        tables = {**RULE_TABLES, **(tables or {})}
+        self.source = source
+
+        self.gender = self._compile_table("gender", tables["gender"])
+        self.colour = self._compile_table("colour", tables["colour"])
+        self.usage = self._compile_table("usage", tables["usage"])
+        self.season = self._compile_table("season", tables["season"])
+        self.category = self._compile_table("category", tables["category"])
+        self.category_sets = {k: frozenset(v) for k, v in self.category.items()}
+
+        roles = tables["article_roles"]
+        if not isinstance(roles, dict) or not all(
+                isinstance(k, str) and isinstance(v, str) for k, v in roles.items()):
+            raise ValueError("Rule table 'article_roles' must map article types to roles")
+        self.article_roles = dict(roles)
+        role_types = {}
+        for article, role in roles.items():
+            role_types.setdefault(role, []).append(article)
+        self.role_article_types = {role: tuple(types) for role, types in role_types.items()}
+        self._role_types = {}
+
+        text = json.dumps(self.to_dict(), sort_keys=True)
+        self.fingerprint = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _compile_table(name, table):
+        """Check a {value: [values]} table and freeze its lists into tuples."""
+        if not isinstance(table, dict) or not all(
+                isinstance(k, str) and isinstance(v, (list, tuple))
+                and all(isinstance(x, str) for x in v)
+                for k, v in table.items()):
+            raise ValueError(f"Rule table {name!r} must map values to lists of values")
+        return {k: tuple(v) for k, v in table.items()}
+
+    @classmethod
+    def load(cls, path=DEFAULT_RULES_PATH):
+        """
+        Rules from a JSON file of {table name: table} overrides (tables it
+        leaves out keep their defaults), or the defaults if there is no file.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                tables = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if not isinstance(tables, dict):
+            raise ValueError(f"{path}: expected a JSON object of rule tables")
+        return cls(tables, source=path)
+
+    def save(self, path):
+        """Write every table to a JSON rules file (e.g. to start editing the defaults)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def to_dict(self):
+        """The tables as plain JSON-ready dicts."""
+        tables = {
+            name: {k: list(v) for k, v in getattr(self, name).items()}
+            for name in RULE_TABLES if name != "article_roles"
+        }
+        tables["article_roles"] = dict(self.article_roles)
+        return tables
+
+    def role_types(self, seed_article, role):
+        """
+        Article types that can fill `role` in a bundle, filtered by
+        compatibility with the seed article type when possible.
+        """
+        key = (seed_article, role)
+        types = self._role_types.get(key)
+        if types is None:
+            types = self.role_article_types.get(role, ())
+            compatible = self.category_sets.get(seed_article)
+            if compatible:
+                types = tuple(t for t in types if t in compatible) or types
+            self._role_types[key] = types
+        return types
+
+    def validate(self, present):
+        """
+        Check the rules against the values a catalog actually has
+        ({column: set of values}). Returns {issue: sorted entries} for every
+        issue found:
+
+        unknown_<table>_values   values a table mentions that no item has
+        colours_without_rules    colours that never earn colour-harmony points
+        articles_without_rules   article types that get no matches
+        articles_without_role    article types never picked for a bundle
+        unreachable_articles     article types never recommended at all
+        unknown_roles            roles outside OUTFIT_ROLE_ORDER
+        """
+        report = {}
+        for name, col in RULE_TABLE_COLUMNS.items():
+            table = getattr(self, name)
+            mentioned = set(table)
+            if name != "article_roles":
+                mentioned.update(v for values in table.values() for v in values)
+            report[f"unknown_{name}_values"] = mentioned - present.get(col, set())
+
+        articles = present.get("articleType", set())
+        roles = set(OUTFIT_ROLE_ORDER)
+        reachable = {v for values in self.category.values() for v in values}
+        reachable.update(a for a, role in self.article_roles.items() if role in roles)
+        report["colours_without_rules"] = present.get("baseColour", set()) - set(self.colour)
+        report["articles_without_rules"] = articles - set(self.category)
+        report["articles_without_role"] = articles - set(self.article_roles)
+        report["unreachable_articles"] = articles - reachable
+        report["unknown_roles"] = set(self.article_roles.values()) - roles
+        return {issue: sorted(entries) for issue, entries in report.items() if entries}
+
+
+@functools.lru_cache(maxsize=None)
+def explanation_template(reasons):
+    """The str.format template explaining a match with the given reason mask."""
+    parts = [template for bit, template in REASON_TEMPLATES if reasons & bit]
+    return " • ".join(parts) or "Complementary style"
+
+
+@functools.lru_cache(maxsize=None)
+def reason_names(reasons):
+    """The names (see REASON_NAMES) of the bits set in a reason mask."""
+    return tuple(name for bit, name in REASON_NAMES.items() if reasons & bit)
+
+
+def mix64(x):
+    """splitmix64 finaliser over a uint64 array (wraps modulo 2**64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_jitter(seed_key, candidate_ids, epoch=0):
+    """
+    Jitter in [JITTER_MIN, JITTER_MAX] for each candidate, derived from a
+    hash of (seed_key, candidate id, epoch). Identical requests get
+    identical jitter within an epoch; a new epoch reshuffles ties.
+    """
+    key = (int(seed_key) * 0x9E3779B97F4A7C15 + int(epoch)) & _MASK64
+    key = mix64(np.array([key], dtype=np.uint64))
+    hashed = mix64(np.asarray(candidate_ids).astype(np.uint64) ^ key)
+    span = np.uint64(JITTER_MAX - JITTER_MIN + 1)
+    return (hashed % span).astype(np.int64) + JITTER_MIN
+
+
+def top_k(scores, k):
+    """
+    Indices of the k highest scores, best first — the same result as
+    np.argsort(-scores, kind="stable")[:k] (ties keep pool order), but
+    found with a partial selection instead of sorting the whole array.
+    """
+    n = len(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
 
-        # Fill missing values with sensible defaults
-        self.df["usage"] = self.df["usage"].fillna("Casual")
-        self.df["season"] = self.df["season"].fillna("Fall")  # Fall = wildcard
-        self.df["baseColour"] = self.df["baseColour"].fillna("Multi")
-        self.df["gender"] = self.df["gender"].fillna("Unisex")
+    # k-th best score; everything above it is in, ties fill the rest in order
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[: k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.argsort(-scores[chosen], kind="stable")]
 
-        # Filter to useful categories only (remove noise)
-        useful = ["Apparel", "Accessories", "Footwear"]
-        self.df = self.df[self.df["masterCategory"].isin(useful)].copy()
-        self.df = self.df.reset_index(drop=True)
 
-        print(f"Catalog loaded: {len(self.df):,} items ready for matching.")
+_catalog_versions = itertools.count(1)
 
-    def _get_item(self, item_id):
+
+def _merge_delta(net, rows, removed):
+    """Fold one delta (rows, removed ids) into the net (rows, removed ids) of earlier ones."""
+    if net is None:
+        return rows, frozenset(removed)
+    net_rows, net_removed = net
+    ids, gone = set(rows["id"].tolist()), set(removed)
+    if ids or gone:
+        net_rows = net_rows[~net_rows["id"].isin(ids | gone)]
+    if len(rows):
+        net_rows = pd.concat([net_rows, rows], ignore_index=True) if len(net_rows) else rows
+    return net_rows, (net_removed - ids) | gone
+
+
+class Catalog:
+    """
+    The cleaned catalog frame plus the lookup structures built from it
+    (id index, attribute codes, compatibility matrices, candidate pools).
+
+    A Catalog is shared read-only by every matcher and page in the process
+    (see load_catalog) — never modify .df in place. Listing changes go
+    through apply_delta, which derives a new snapshot.
+    """
+
+    def __init__(self, df, rules=None):
+        self.rules = rules if rules is not None else RuleSet()
+        self.df = encode_catalog(df, self.rules)
+
+        # Distinguishes this catalog from any reloaded one (cache keys)
+        self.version = next(_catalog_versions)
+
+        # Versions of the files it was loaded from (see load_catalog)
+        self.stamp = None
+
+        self._build_id_index()
+
+        self._build_scoring_index()
+        self._build_pool_index()
+
+        # Browse-page text search over product names, and filter facets
+        self.search_index = SearchIndex(self.df["productDisplayName"].tolist())
+        self.facet_index = FacetIndex(self.df, FACET_COLUMNS)
+
+        # Incremental updates since the frame was built (see apply_delta):
+        # which rows are still listed (None = all), a search index over the
+        # appended rows, and the deltas themselves, for replaying onto a
+        # compacted snapshot
+        self.alive = None
+        self.search_delta = None
+        self.pending_deltas = ()
+        self.base_version = self.version
+
+        # Every delta since the catalog was loaded from its files, folded
+        # into one net (rows, removed ids) record (kept by compaction, and
+        # replayed onto a reload when only the rules changed), how many
+        # there were, and the number of the delta that last changed each id
+        self.net_delta = None
+        self.delta_count = 0
+        self._changed = {}
+        self._changed_ids = {}
+
+    @classmethod
+    def load(cls, catalog_path=DEFAULT_CATALOG_PATH, artifact_path=None, rules=None):
+        """Load a catalog from its columnar artifact, or from the CSV."""
+        if artifact_path is None:
+            artifact_path = artifact_path_for(catalog_path)
+
+        # Prefer the preprocessed columnar artifact written by setup_data.py;
+        # parse and clean the CSV only when it is missing or stale.
+        df = read_catalog_artifact(artifact_path, source_path=catalog_path)
+        if df is None:
+            df = prepare_catalog(pd.read_csv(catalog_path, on_bad_lines="skip"))
+
+        catalog = cls(df, rules)
+        print(f"Catalog loaded: {len(df):,} items ready for matching.")
+        if catalog.rule_report:
+            issues = ", ".join(f"{issue} ({len(v)})" for issue, v in catalog.rule_report.items())
+            print(f"Rule check: {issues}.")
+        return catalog
+
+    def __len__(self):
+        return len(self.df)
+
+    def _build_id_index(self):
+        """
+        Map id -> row position, so item lookups don't scan the catalog.
+        Catalog ids are small dense integers, so a flat position array is
+        used when it stays compact; otherwise fall back to a dict.
+        """
+        ids = self.ids = self.df["id"].to_numpy()
+        self._id_array = None
+        self._id_index = None
+        if len(ids) and ids.min() >= 0 and ids.max() <= 4 * len(ids) + 1024:
+            self._id_array = np.full(int(ids.max()) + 1, -1, dtype=np.int32)
+            self._id_array[ids] = np.arange(len(ids), dtype=np.int32)
+        else:
+            self._id_index = dict(zip(ids.tolist(), range(len(ids))))
+
+    def _build_scoring_index(self):
+        """
+        Collect the categorical codes used for scoring, compile the colour,
+        usage and season rules into boolean compatibility matrices, and
+        check the rules against the catalog (see RuleSet.validate).
+        """
+        self.vocab = {}
+        self.codes = {}
+        self.labels = {}
+        for col in CATEGORICAL_COLUMNS:
+            if col in self.df.columns:
+                categories = self.df[col].cat.categories
+                self.vocab[col] = {v: i for i, v in enumerate(categories)}
+                self.codes[col] = self.df[col].cat.codes.to_numpy()
+                # Trailing None, so labels[codes] maps the code -1 to None
+                self.labels[col] = np.append(categories.to_numpy(dtype=object), None)
+
+        self._build_compat_matrices()
+
+        present = {}
+        for col, codes in self.codes.items():
+            used = np.bincount(codes[codes >= 0], minlength=len(self.vocab[col]))
+            present[col] = set(self.labels[col][np.flatnonzero(used)].tolist())
+        self.rule_report = self.rules.validate(present)
+
+    def _build_compat_matrices(self):
+        """Compile the colour, usage and season rules against the vocabularies."""
+        self.colour_compat = _compat_matrix(
+            self.rules.colour, self.vocab["baseColour"], default_self=False
+        )
+        self.usage_compat = _compat_matrix(
+            self.rules.usage, self.vocab["usage"], default_self=True
+        )
+        self.season_compat = _compat_matrix(
+            self.rules.season, self.vocab["season"], default_self=True
+        )
+
+    def _build_pool_index(self):
+        """
+        Precompute candidate row positions per (seed gender, articleType),
+        so a pool is assembled by concatenating ready-made buckets instead
+        of filtering the whole catalog.
+        """
+        by_gender = {}
+        groups = self.df.groupby(["gender", "articleType"], sort=False, observed=True).indices
+        for (gender, article), positions in groups.items():
+            by_gender.setdefault(gender, {})[article] = positions
+        self._gender_buckets = by_gender
+
+        self._pool_index = {}
+        for seed_gender, allowed in self.rules.gender.items():
+            parts = {}
+            for gender in allowed:
+                for article, positions in by_gender.get(gender, {}).items():
+                    parts.setdefault(article, []).append(positions)
+            self._pool_index[seed_gender] = {
+                article: np.sort(np.concatenate(chunks))
+                for article, chunks in parts.items()
+            }
+
+    # -----------------------------------------------------------------------
+    # Incremental updates
+    # -----------------------------------------------------------------------
+    def apply_delta(self, rows=None, removed=()):
+        """
+        A new snapshot with the listings in rows (a frame with the catalog's
+        columns) added — replacing listed items with the same id — and the
+        items whose ids are in removed taken down. This snapshot is left
+        as it is.
+
+        No index is rebuilt from scratch. Replaced and removed rows stay in
+        the frame but are tombstoned: they are dropped from the id index,
+        their candidate buckets and browse results. New rows are appended
+        with their codes, buckets and facet bits, and their names go into
+        a small search index of their own, whose ranking weights are only
+        approximate. See compact().
+
+        It is still O(catalog size) in copying: the frame, the id and code
+        arrays and every facet bitmap are copied to extend them (~35 ms per
+        delta at 40k rows, ~200 ms at 400k), so send bulk changes as one
+        delta.
+
+        Raises ValueError for rows the catalog would not keep (see
+        prepare_catalog), so a replacement is never silently dropped.
+        """
+        if rows is None:
+            rows = self.df.iloc[:0]
+        missing = [col for col in self.df.columns if col not in rows.columns]
+        if missing:
+            raise ValueError(f"Delta rows are missing columns: {', '.join(missing)}")
+        rows = rows.drop_duplicates("id", keep="last")
+        removed = tuple(removed)
+
+        dead = [self.item_position(i) for i in removed + tuple(rows["id"].tolist())]
+        dead = np.array(sorted({p for p in dead if p is not None}), dtype=np.intp)
+
+        rows = rows[list(self.df.columns)]
+        prepared = prepare_catalog(rows)
+        if len(prepared) < len(rows):
+            dropped = sorted(set(rows["id"].tolist()) - set(prepared["id"].tolist()))
+            raise ValueError(f"Delta rows outside the outfit categories: ids {dropped}")
+
+        catalog = copy.copy(self)
+        catalog.version = next(_catalog_versions)
+        catalog.pending_deltas = self.pending_deltas + ((rows, removed),)
+        catalog.net_delta = _merge_delta(self.net_delta, rows, removed)
+        catalog.delta_count = self.delta_count + 1
+        catalog._changed = {**self._changed,
+                            **dict.fromkeys(rows["id"].tolist(), catalog.delta_count)}
+        catalog._changed_ids = {}
+        catalog.df = self._appended_frame(prepared)
+
+        start = len(self.df)
+        alive = self.alive
+        if alive is not None or len(dead):
+            alive = np.ones(len(catalog.df), dtype=bool)
+            if self.alive is not None:
+                alive[:start] = self.alive
+            alive[dead] = False
+        catalog.alive = alive
+
+        catalog._update_id_index(dead, start)
+        catalog._update_scoring_index()
+        catalog._update_pool_index(dead, start)
+
+        names = catalog.df["productDisplayName"]
+        base = self.search_index.num_rows
+        catalog.search_delta = SearchIndex(names.iloc[base:].tolist()) \
+            if len(catalog.df) > base else None
+        catalog.facet_index = self.facet_index.updated(catalog.df, dead)
+        return catalog
+
+    def _appended_frame(self, rows):
+        """
+        self.df with prepared rows appended. Attribute values new to the
+        catalog become extra categories at the end, so existing codes stay
+        valid.
+        """
+        df = self.df.copy(deep=False)
+        rows = rows.copy(deep=False)
+        for col in df.columns:
+            if col in CATEGORICAL_COLUMNS:
+                known = df[col].cat.categories
+                new = sorted(set(rows[col].dropna().unique()) - set(known))
+                if new:
+                    df[col] = df[col].cat.add_categories(new)
+                rows[col] = pd.Categorical(rows[col], categories=df[col].cat.categories)
+            else:
+                rows[col] = rows[col].astype(df[col].dtype)
+        return pd.concat([df, rows], ignore_index=True)
+
+    def _update_id_index(self, dead, start):
+        """Point the id index away from the dead rows and at rows[start:]."""
+        old_ids = self.ids
+        ids = self.ids = self.df["id"].to_numpy()
+        new_ids = ids[start:]
+        id_array = self._id_array
+        if id_array is not None and len(new_ids) \
+                and (new_ids.min() < 0 or new_ids.max() > 4 * len(ids) + 1024):
+            # The new ids aren't dense any more: switch to the dict
+            listed = np.flatnonzero(id_array >= 0)
+            self._id_index = dict(zip(listed.tolist(), id_array[listed].tolist()))
+            id_array = self._id_array = None
+
+        if id_array is not None:
+            size = max(len(id_array), int(new_ids.max()) + 1 if len(new_ids) else 0)
+            self._id_array = np.full(size, -1, dtype=np.int32)
+            self._id_array[:len(id_array)] = id_array
+            self._id_array[old_ids[dead]] = -1
+            self._id_array[new_ids] = np.arange(start, len(ids), dtype=np.int32)
+        else:
+            index = dict(self._id_index)
+            for item_id in old_ids[dead].tolist():
+                index.pop(item_id, None)
+            index.update(zip(new_ids.tolist(), range(start, len(ids))))
+            self._id_index = index
+
+    def _update_scoring_index(self):
+        """Refresh codes, and vocabularies and matrices of columns that gained values."""
+        vocab, labels = dict(self.vocab), dict(self.labels)
+        self.codes = {}
+        changed = False
+        for col in vocab:
+            categories = self.df[col].cat.categories
+            self.codes[col] = self.df[col].cat.codes.to_numpy()
+            if len(categories) != len(vocab[col]):
+                vocab[col] = {v: i for i, v in enumerate(categories)}
+                labels[col] = np.append(categories.to_numpy(dtype=object), None)
+                changed = changed or col in RULE_VOCABULARY
+        self.vocab, self.labels = vocab, labels
+        if changed:
+            self._build_compat_matrices()
+
+    def _update_pool_index(self, dead, start):
+        """Take the dead rows out of their buckets and add rows[start:] to theirs."""
+        genders, articles = self.codes["gender"], self.codes["articleType"]
+        changes = {}  # (gender, articleType) -> (removed positions, added positions)
+        for side, positions in enumerate((dead, np.arange(start, len(self.df)))):
+            for pos, g, a in zip(positions.tolist(), genders[positions].tolist(),
+                                 articles[positions].tolist()):
+                if g >= 0 and a >= 0:
+                    key = (self.labels["gender"][g], self.labels["articleType"][a])
+                    changes.setdefault(key, ([], []))[side].append(pos)
+
+        by_gender = dict(self._gender_buckets)
+        for (gender, article), (gone, added) in changes.items():
+            buckets = by_gender[gender] = dict(by_gender.get(gender, {}))
+            positions = buckets.get(article, np.empty(0, dtype=np.intp))
+            if gone:
+                positions = positions[~np.isin(positions, gone)]
+            positions = np.concatenate([positions, np.array(added, dtype=np.intp)])
+            if len(positions):
+                buckets[article] = positions
+            else:
+                del buckets[article]
+        self._gender_buckets = {g: b for g, b in by_gender.items() if b}
+
+        pool_index = dict(self._pool_index)
+        for seed_gender, allowed in self.rules.gender.items():
+            affected = {article for gender, article in changes if gender in allowed}
+            if not affected:
+                continue
+            parts = pool_index[seed_gender] = dict(pool_index.get(seed_gender, {}))
+            for article in affected:
+                chunks = [self._gender_buckets[g][article] for g in allowed
+                          if article in self._gender_buckets.get(g, {})]
+                if chunks:
+                    parts[article] = np.sort(np.concatenate(chunks))
+                else:
+                    parts.pop(article, None)
+        self._pool_index = pool_index
+
+    def changed_ids(self, since=0):
+        """Ids of the listings added or replaced by the deltas after the first `since`."""
+        changed = self._changed_ids.get(since)
+        if changed is None:
+            changed = frozenset(i for i, n in self._changed.items() if n > since)
+            self._changed_ids[since] = changed
+        return changed
+
+    def with_deltas_of(self, other):
+        """
+        This snapshot with the net listing changes made to `other` since it
+        was loaded applied as one delta (e.g. onto a reload of the same
+        files with new rules). The change history carries over.
+        """
+        if other.net_delta is None:
+            return self
+        catalog = self.apply_delta(*other.net_delta)
+        catalog.net_delta = other.net_delta
+        catalog.delta_count = other.delta_count
+        catalog._changed = other._changed
+        return catalog
+
+    def delta_size(self):
+        """Rows appended or tombstoned by apply_delta since the frame was built."""
+        dead = len(self.alive) - int(self.alive.sum()) if self.alive is not None else 0
+        return len(self.df) - self.search_index.num_rows + dead
+
+    def compact(self):
+        """
+        A snapshot of the listed rows with every index built from scratch,
+        as if the catalog had been loaded with the deltas already applied.
+        The net delta and change history are kept.
+        """
+        df = self.df if self.alive is None else self.df[self.alive]
+        catalog = Catalog(df.reset_index(drop=True), self.rules)
+        catalog.stamp = self.stamp
+        catalog.net_delta = self.net_delta
+        catalog.delta_count = self.delta_count
+        catalog._changed = self._changed
+        return catalog
+
+    def memory_report(self):
+        """
+        Approximate memory footprint in bytes of the catalog frame (per
+        column) and of the lookup structures built from it.
+
+        Columns memory-mapped from the columnar artifact are counted too,
+        although their pages are shared between processes.
+        """
+        columns = {
+            col: int(nbytes)
+            for col, nbytes in self.df.memory_usage(index=False, deep=True).items()
+        }
+        if self._id_array is not None:
+            id_index = self._id_array.nbytes
+        else:
+            id_index = sys.getsizeof(self._id_index) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._id_index.items()
+            )
+        indexes = {
+            "id_index":      id_index,
+            "compat_tables": int(self.colour_compat.nbytes
+                                 + self.usage_compat.nbytes
+                                 + self.season_compat.nbytes),
+            "pool_buckets":  int(
+                sum(a.nbytes for b in self._pool_index.values() for a in b.values())
+                + sum(a.nbytes for b in self._gender_buckets.values() for a in b.values())
+            ),
+            "search_index":  self.search_index.nbytes() + (
+                self.search_delta.nbytes() if self.search_delta is not None else 0
+            ),
+            "facet_index":   self.facet_index.nbytes(),
+        }
+        return {
+            "rows":    len(self.df),
+            "columns": columns,
+            "indexes": indexes,
+            "total":   sum(columns.values()) + sum(indexes.values()),
+        }
+
+    def buckets(self):
+        """Yield (gender, articleType, row positions) for every non-empty bucket."""
+        for gender, articles in self._gender_buckets.items():
+            for article, positions in articles.items():
+                yield gender, article, positions
+
+    def search(self, query):
+        """Row positions of the listed items whose names match query, best first."""
+        if self.search_delta is None and self.alive is None:
+            return self.search_index.search(query)
+        rows, scores = self.search_index.matches(query)
+        if self.search_delta is not None:
+            delta_rows, delta_scores = self.search_delta.matches(query)
+            rows = np.concatenate([rows, delta_rows + self.search_index.num_rows])
+            scores = np.concatenate([scores, delta_scores])
+        if self.alive is not None:
+            listed = self.alive[rows]
+            rows, scores = rows[listed], scores[listed]
+        return rows[np.argsort(-scores, kind="stable")]
+
+    def browse(self, query="", filters=None, offset=0, page_size=60, columns=None):
+        """
+        One page of browse results: items whose names match query (if it
+        has any words) and every {column: value} in filters, best search matches first,
+        otherwise in catalog order.
+
+        Only the page's rows (and only the given columns) are materialized.
+        Returns {"items": DataFrame, "total": ..., "offset": ...,
+        "next_offset": ... or None on the last page}.
+        """
+        filters = filters or {}
+        if tokenize(query):
+            # Ranking needs every match, but that costs posting lists, not rows
+            positions = self.facet_index.filter(filters, self.search(query))
+            total = len(positions)
+            positions = positions[offset:offset + page_size]
+        else:
+            positions, total = self.facet_index.page(filters, offset, page_size)
+
+        frame = self.df if columns is None else self.df[columns]
+        end = offset + len(positions)
+        return {
+            "items":       frame.take(positions),
+            "total":       total,
+            "offset":      offset,
+            "next_offset": end if end < total else None,
+        }
+
+    def item_position(self, item_id):
+        """Return the row position of item_id in self.df, or None if unknown."""
+        if self._id_array is None:
+            return self._id_index.get(item_id)
+        try:
+            pos = int(self._id_array[item_id]) if item_id >= 0 else -1
+        except (IndexError, TypeError):
+            return None
+        return pos if pos >= 0 else None
+
+    def positions_of(self, item_ids):
+        """Row positions of item_ids, or None if any of them is unknown."""
+        positions = np.empty(len(item_ids), dtype=np.intp)
+        for i, item_id in enumerate(item_ids):
+            pos = self.item_position(item_id)
+            if pos is None:
+                return None
+            positions[i] = pos
+        return positions
+
+    def get_item(self, item_id):
         """Fetch a single item by ID."""
-        result = self.df[self.df["id"] == item_id]
-        if result.empty:
+        pos = self.item_position(item_id)
+        if pos is None:
             return None
-        return result.iloc[0]
+        return self.df.iloc[pos]
 
-    def _score_candidate(self, seed, candidate):
+    def column_values(self, positions, columns):
         """
-        Score how well a candidate item matches the seed item.
-        Returns an integer score (higher = better match).
+        [values of column at positions] for each of columns, as plain Python
+        values — one slice per column instead of one Series per row.
         """
-        score = 0
+        values = []
+        for col in columns:
+            if col in self.labels:
+                values.append(self.labels[col][self.codes[col][positions]].tolist())
+            elif pd.api.types.is_numeric_dtype(self.df[col]):
+                values.append(self.df[col].to_numpy()[positions].tolist())
+            else:
+                values.append(self.df[col].array.take(positions).tolist())
+        return values
+
+    def seed_codes(self, seed):
+        """Encode the scored attributes of a seed item (-1 = unknown value)."""
+        return {col: self.vocab[col].get(seed.get(col), -1) for col in SCORED_COLUMNS}
+
+    def candidate_pool(self, seed_gender, article_types=None, exclude=None):
+        """
+        Return the row positions of gender-compatible items, optionally
+        restricted to article_types and excluding the row at `exclude`.
+        """
+        # Genders without gender rules only match themselves
+        buckets = self._pool_index.get(seed_gender)
+        if buckets is None:
+            buckets = self._gender_buckets.get(seed_gender, {})
 
-        # Colour harmony — soft +30
-        seed_colour = seed["baseColour"]
-        cand_colour = candidate["baseColour"]
-        compatible_colours = COLOUR_COMPAT.get(seed_colour, [])
-        if cand_colour in compatible_colours:
-            score += 30
+        if article_types is None:
+            parts = list(buckets.values())
+        else:
+            parts = [buckets[a] for a in dict.fromkeys(article_types) if a in buckets]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
 
-        # Usage/occasion — soft +25
-        seed_usage = seed["usage"]
-        cand_usage = candidate["usage"]
-        compatible_usages = USAGE_COMPAT.get(seed_usage, [seed_usage])
-        if cand_usage in compatible_usages:
-            score += 25
+        pool = np.concatenate(parts)
+        if exclude is not None:
+            pool = pool[pool != exclude]
+        return pool
 
-        # Season — soft +15
-        seed_season = seed["season"]
-        cand_season = candidate["season"]
-        compatible_seasons = SEASON_COMPAT.get(seed_season, [seed_season])
-        if cand_season in compatible_seasons:
-            score += 15
 
-        # Same seller boost +40 (encourages bundle purchases)
-        if seed["seller"] == candidate["seller"]:
-            score += 40
+# ---------------------------------------------------------------------------
+# CATALOG PROVIDER
+# One Catalog per catalog file per process, shared by the browse page, the
+# upload page and every OutfitMatcher. A Catalog is an immutable snapshot;
+# a reload or a CatalogWatcher publishes a new one instead of changing it.
+# ---------------------------------------------------------------------------
+_catalogs = {}
+_watchers = {}
+_catalogs_lock = threading.Lock()
 
-        # Random variation so results feel less robotic
-        score += random.randint(1, 15)
 
-        return score
+def _catalog_key(catalog_path, artifact_path, rules_path):
+    return (os.path.abspath(catalog_path), artifact_path, os.path.abspath(rules_path))
 
-    def _gender_filter(self, seed_gender):
-        """Return a filtered dataframe with only gender-compatible items."""
-        allowed = GENDER_COMPAT.get(seed_gender, [seed_gender])
-        return self.df[self.df["gender"].isin(allowed)]
 
-    def _build_explanation(self, seed, candidate, score):
-        """Generate a short human-readable explanation for the match."""
-        reasons = []
+def _snapshot_stamp(catalog_path, artifact_path, rules_path):
+    """Versions of the CSV, the columnar artifact build and the rules file."""
+    if artifact_path is None:
+        artifact_path = artifact_path_for(catalog_path)
+    build = (read_meta(artifact_path) or {}).get("build")
+    return (source_stamp(catalog_path), build, source_stamp(rules_path))
 
-        seed_colour = seed["baseColour"]
-        cand_colour = candidate["baseColour"]
-        if cand_colour in COLOUR_COMPAT.get(seed_colour, []):
-            reasons.append(f"Colour harmony ({seed_colour} + {cand_colour})")
 
-        seed_usage = seed["usage"]
-        if candidate["usage"] in USAGE_COMPAT.get(seed_usage, []):
-            reasons.append(f"{candidate['usage']} vibe")
+def _load_snapshot(catalog_path, artifact_path, rules_path):
+    """Build a new Catalog from the files, stamped with their versions."""
+    # Stamp first: a file changing mid-load then shows up as a later change
+    stamp = _snapshot_stamp(catalog_path, artifact_path, rules_path)
+    catalog = Catalog.load(catalog_path, artifact_path, RuleSet.load(rules_path))
+    catalog.stamp = stamp
+    return catalog
+
+
+def _carry_deltas(current, catalog):
+    """
+    A snapshot just loaded from the files, with the listing deltas applied
+    to current replayed when it was loaded from the same CSV and artifact
+    (only the rules changed). A new export replaces the deltas.
+    """
+    if current is None or current.net_delta is None or current.stamp is None \
+            or catalog.stamp is None or current.stamp[:2] != catalog.stamp[:2]:
+        return catalog
+    return catalog.with_deltas_of(current)
+
+
+def load_catalog(catalog_path=DEFAULT_CATALOG_PATH, artifact_path=None, reload=False,
+                 rules_path=DEFAULT_RULES_PATH):
+    """
+    Return the current shared, read-only Catalog for catalog_path, loading
+    it (and its rules from rules_path) on first use, or again with
+    reload=True (keeping listing deltas, see _carry_deltas).
+    """
+    key = _catalog_key(catalog_path, artifact_path, rules_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or reload:
+            catalog = _carry_deltas(catalog, _load_snapshot(catalog_path, artifact_path,
+                                                            rules_path))
+            _catalogs[key] = catalog
+    return catalog
+
+
+def _replace_catalog(key, current, catalog):
+    """Publish catalog in place of current, unless another snapshot already was."""
+    with _catalogs_lock:
+        if _catalogs.get(key) is not current:
+            return False
+        _catalogs[key] = catalog
+    return True
+
+
+def watch_catalog(catalog_path=DEFAULT_CATALOG_PATH, artifact_path=None,
+                  rules_path=DEFAULT_RULES_PATH, interval=30):
+    """
+    Keep the shared Catalog for catalog_path current in the background
+    (see CatalogWatcher). One watcher runs per catalog, however many
+    matchers ask for it. Returns the watcher.
+    """
+    load_catalog(catalog_path, artifact_path, rules_path=rules_path)
+    key = _catalog_key(catalog_path, artifact_path, rules_path)
+    with _catalogs_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = CatalogWatcher(catalog_path, artifact_path, rules_path, interval)
+            _watchers[key] = watcher
+    watcher.start()
+    return watcher
+
+
+class CatalogWatcher:
+    """
+    Polls the files a shared Catalog is built from (the CSV, the columnar
+    artifact's current build and the rules file) every `interval` seconds.
+    When they have changed, and stayed the same for one more poll so a
+    file still being written isn't read, a new snapshot — frame plus every
+    index — is built on the watcher thread and then published with a
+    single assignment.
+
+    Requests that already took the old snapshot finish on it, later ones
+    get the new one, and result caches (keyed on Catalog.version) stop
+    hitting the old entries. If a rebuild fails, the old snapshot is kept
+    until the files change again.
+
+    Listing deltas (see OutfitMatcher.apply_delta) are replayed onto the
+    new snapshot, as one net delta, when only the rules file changed. A new CSV or artifact
+    build is a fresh export and replaces them.
+    """
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH, artifact_path=None,
+                 rules_path=DEFAULT_RULES_PATH, interval=30):
+        self.catalog_path = catalog_path
+        self.artifact_path = artifact_path
+        self.rules_path = rules_path
+        self.interval = interval
+        self.key = _catalog_key(catalog_path, artifact_path, rules_path)
+        self.reloads = 0
+        self.failures = 0
+        self._pending = None   # changed stamp seen at the previous poll
+        self._failed = None    # stamp whose rebuild failed
+        # Called at every poll, e.g. to reopen a rebuilt RecommendationStore
+        self.on_poll = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def start(self):
+        """Start polling on a daemon thread (no-op if already running)."""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="catalog-watcher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        with self._thread_lock:
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """
+        Poll once, swapping in a new snapshot if the files changed and have
+        settled. Returns True if a new snapshot was published.
+        """
+        for callback in list(self.on_poll):
+            callback()
+
+        current = _catalogs.get(self.key)
+        stamp = _snapshot_stamp(self.catalog_path, self.artifact_path, self.rules_path)
+        if (current is not None and stamp == current.stamp) or stamp == self._failed:
+            self._pending = None
+            return False
+        if stamp != self._pending:
+            self._pending = stamp  # wait one poll for it to settle
+            return False
+
+        try:
+            catalog = _load_snapshot(self.catalog_path, self.artifact_path, self.rules_path)
+        except (OSError, ValueError, KeyError) as exc:
+            self.failures += 1
+            self._failed = stamp
+            kept = f"version {current.version}" if current is not None else "no catalog"
+            print(f"Catalog reload failed, keeping {kept}: {exc}")
+            return False
+
+        rebuilt = catalog
+        while True:
+            catalog = _carry_deltas(current, rebuilt)
+            if _replace_catalog(self.key, current, catalog):
+                break
+            current = _catalogs.get(self.key)  # a delta landed meanwhile
+        self._pending = None
+        self.reloads += 1
+        print(f"Catalog snapshot {catalog.version} is live ({len(catalog):,} items).")
+        return True
+
+
+# ---------------------------------------------------------------------------
+# RESULT TYPES
+# Immutable, so cached results can be handed out without copying.
+# ---------------------------------------------------------------------------
+class Match(namedtuple("Match", [
+    "id", "name", "articleType", "subCategory", "colour", "seller",
+    "price", "condition", "score", "explanation", "reasons",
+])):
+    """One get_matches result. reasons: names of the rules it satisfied."""
+    __slots__ = ()
+
+    @property
+    def image_path(self):
+        return f"data/images/{self.id}.jpg"
+
+
+class BundleItem(namedtuple("BundleItem", [
+    "id", "name", "articleType", "role", "colour", "seller",
+    "price", "condition", "is_seed",
+])):
+    """One piece of an outfit bundle (id None for a virtual seed)."""
+    __slots__ = ()
+
+    @property
+    def image_path(self):
+        return f"data/images/{self.id}.jpg" if self.id is not None else None
+
+
+class OutfitMatcher:
+    """
+    Matches fashion items to build complementary outfits.
+    Uses rule-based scoring with soft/hard filters.
+    """
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH, artifact_path=None, catalog=None,
+                 recommendations=None, jitter="hash", jitter_epoch=0, jitter_period=None,
+                 cache_size=1024, cache_ttl=600, rules_path=DEFAULT_RULES_PATH,
+                 watch_interval=None):
+        self.catalog_path = catalog_path
+        self.artifact_path = artifact_path
+        self.rules_path = rules_path
+
+        # A given catalog is used as is; otherwise the matcher follows the
+        # shared one for catalog_path, which watch_interval (seconds) keeps
+        # current in the background (see CatalogWatcher)
+        self._catalog = catalog
+        self._catalog_lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self.watcher = None
+        if catalog is None:
+            if watch_interval:
+                self.watcher = watch_catalog(catalog_path, artifact_path, rules_path,
+                                             watch_interval)
+            else:
+                load_catalog(catalog_path, artifact_path, rules_path=rules_path)
+
+        # Optional precomputed RecommendationStore (see recommendation_store.py);
+        # anything it can't answer is computed live
+        self.recommendations = recommendations
+        if self.watcher is not None and recommendations is not None:
+            self.watcher.on_poll.append(self._reopen_recommendations)
+
+        # Jitter: see JITTER_MODES. With jitter_period (seconds) set, the
+        # epoch rotates over time on top of jitter_epoch.
+        if jitter not in JITTER_MODES:
+            raise ValueError(f"jitter must be one of {JITTER_MODES}, got {jitter!r}")
+        self.jitter = jitter
+        self.jitter_epoch = jitter_epoch
+        self.jitter_period = jitter_period
+        self._rng = np.random.default_rng()
+
+        # Results of get_matches / get_outfit_bundle (cache_size=0 disables).
+        # Only used with hash jitter — random jitter is meant to vary.
+        self.cache = ResultCache(cache_size, cache_ttl) if cache_size else None
+
+    @property
+    def catalog(self):
+        """
+        The current catalog snapshot. Read it once per request: a reload
+        can publish a newer one at any time.
+        """
+        if self._catalog is not None:
+            return self._catalog
+        return load_catalog(self.catalog_path, self.artifact_path, rules_path=self.rules_path)
+
+    def reload_catalog(self):
+        """
+        Reload the catalog (and its rules) from disk and drop cached
+        results. Listing deltas are kept unless the CSV or artifact changed.
+        """
+        self._catalog = None
+        load_catalog(self.catalog_path, self.artifact_path, reload=True,
+                     rules_path=self.rules_path)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def apply_delta(self, added=None, updated=None, removed=None):
+        """
+        Apply listing changes without reloading the catalog. added: new
+        listings, with the catalog's columns. updated: edited listings, by
+        id, with just the columns that changed (missing or NaN values are
+        kept). removed: ids of sold or withdrawn listings. added and
+        updated may be DataFrames or lists of dicts. Rows outside the
+        outfit categories raise ValueError and nothing is applied.
+
+        The changes are published as a new snapshot (see
+        Catalog.apply_delta) for every matcher sharing the catalog, so the
+        next request no longer returns removed items. Once enough changes
+        pile up, the catalog is compacted on a background thread. Returns
+        the number of listings added (new ids), updated (replaced) and
+        removed, and the new version: {"added": ..., "updated": ...,
+        "removed": ..., "version": ...}.
+        """
+        removed = [] if removed is None else list(removed)
+        while True:
+            current = self.catalog
+            rows = self._delta_rows(current, added, updated)
+            catalog = current.apply_delta(rows, removed)
+            if self._swap_catalog(current, catalog):
+                break
+            # A reload or another delta got in first — apply ours on top of it
+
+        ids = set(rows["id"].tolist()) if rows is not None else set()
+        replaced = sum(current.item_position(i) is not None for i in ids)
+        counts = {
+            "added":   len(ids) - replaced,
+            "updated": replaced,
+            "removed": sum(current.item_position(i) is not None for i in set(removed) - ids),
+            "version": catalog.version,
+        }
+        if catalog.delta_size() > max(COMPACT_MIN_ROWS, COMPACT_FRACTION * len(catalog)) \
+                and self._compaction_lock.acquire(blocking=False):
+            threading.Thread(target=self._compact_in_background,
+                             name="catalog-compaction", daemon=True).start()
+        return counts
+
+    @staticmethod
+    def _delta_rows(catalog, added, updated):
+        """
+        One frame of full rows for apply_delta: the added listings plus the
+        updated ones merged over their current rows (updates to unknown ids
+        are dropped), or None if there are none.
+        """
+        frames = []
+        added = pd.DataFrame(added) if added is not None else pd.DataFrame()
+        if len(added):
+            frames.append(added)
+
+        updated = pd.DataFrame(updated) if updated is not None else pd.DataFrame()
+        if len(updated):
+            positions = [catalog.item_position(i) for i in updated["id"].tolist()]
+            known = np.array([p is not None for p in positions], dtype=bool)
+            current = catalog.df.take([p for p in positions if p is not None])
+            current = current.astype(object).reset_index(drop=True)
+            changes = updated[known].reset_index(drop=True)
+            for col in changes.columns.intersection(current.columns):
+                current[col] = changes[col].where(changes[col].notna(), current[col])
+            frames.append(current)
+
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def _swap_catalog(self, current, catalog):
+        """Make catalog this matcher's snapshot in place of current (see _replace_catalog)."""
+        with self._catalog_lock:
+            if self._catalog is not None:
+                if self._catalog is not current:
+                    return False
+                self._catalog = catalog
+                return True
+        key = _catalog_key(self.catalog_path, self.artifact_path, self.rules_path)
+        return _replace_catalog(key, current, catalog)
+
+    def compact_catalog(self):
+        """
+        Fold the listing deltas applied so far into a freshly built
+        snapshot (see Catalog.compact). Deltas applied while it builds are
+        replayed onto it. Returns False if the catalog was reloaded from
+        its files meanwhile, which makes the compaction moot.
+        """
+        base = self.catalog
+        compacted = base.compact()
+        while True:
+            current = self.catalog
+            if current.base_version != base.base_version:
+                return False
+            catalog = compacted
+            for rows, removed in current.pending_deltas[len(base.pending_deltas):]:
+                catalog = catalog.apply_delta(rows, removed)
+            if self._swap_catalog(current, catalog):
+                print(f"Catalog compacted into snapshot {catalog.version} "
+                      f"({len(catalog):,} items).")
+                return True
+
+    def _compact_in_background(self):
+        try:
+            self.compact_catalog()
+        finally:
+            self._compaction_lock.release()
+
+    def cache_stats(self):
+        """Result cache counters (see ResultCache.stats), or None if disabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _cached(self, kind, compute, item_id, size):
+        """
+        Return compute(catalog, item_id, size), served from the result cache
+        when possible. Each call gets its own list (the results themselves
+        are immutable).
+        """
+        catalog = self.catalog
+        if self.cache is None or self.jitter != "hash":
+            return compute(catalog, item_id, size)
+
+        key = (kind, item_id, size, catalog.version, self.current_jitter_epoch())
+        results = self.cache.get(key)
+        if results is None:
+            results = compute(catalog, item_id, size)
+            self.cache.put(key, results)
+        return list(results)
+
+    def current_jitter_epoch(self):
+        """The jitter epoch in effect right now."""
+        if self.jitter_period:
+            return self.jitter_epoch + int(time.time() // self.jitter_period)
+        return self.jitter_epoch
+
+    @property
+    def df(self):
+        """The shared catalog frame (read-only)."""
+        return self.catalog.df
+
+    def memory_report(self):
+        """Approximate memory footprint of the shared catalog (see Catalog.memory_report)."""
+        return self.catalog.memory_report()
+
+    def item_position(self, item_id):
+        """Return the row position of item_id in self.df, or None if unknown."""
+        return self.catalog.item_position(item_id)
+
+    def get_item(self, item_id):
+        """Fetch a single item by ID."""
+        return self.catalog.get_item(item_id)
 
-        if seed["seller"] == candidate["seller"]:
-            reasons.append("Same seller — save on shipping!")
+    @staticmethod
+    def _rule_reasons(catalog, seed_codes, positions):
+        """
+        Colour, usage and season reason bits (see REASON_NAMES) for the
+        candidates at the given row positions. These depend only on the
+        seed's attributes, so seeds that share them can share this array.
+        """
+        # Colour harmony — soft +30
+        colours = catalog.codes["baseColour"][positions]
+        reasons = catalog.colour_compat[seed_codes["baseColour"]][colours] * np.uint8(REASON_COLOUR)
+
+        # Usage/occasion — soft +25
+        usages = catalog.codes["usage"][positions]
+        reasons |= catalog.usage_compat[seed_codes["usage"]][usages] * np.uint8(REASON_USAGE)
 
-        if not reasons:
-            reasons.append("Complementary style")
+        # Season — soft +15
+        seasons = catalog.codes["season"][positions]
+        reasons |= catalog.season_compat[seed_codes["season"]][seasons] * np.uint8(REASON_SEASON)
 
-        return " • ".join(reasons)
+        return reasons
+
+    def _seed_scores(self, seed_key, seed_seller, pool_ids, pool_sellers, rule_reasons):
+        """
+        Add the per-seed same-seller bit to shared rule reasons and score
+        them, with jitter. Returns (scores, reasons).
+        """
+        # Same seller boost +40 (encourages bundle purchases)
+        same_seller = (pool_sellers == seed_seller) & (seed_seller >= 0)
+        reasons = rule_reasons | same_seller * np.uint8(REASON_SAME_SELLER)
+        scores = REASON_POINTS[reasons]
+
+        # Small variation so results feel less robotic
+        if self.jitter == "hash":
+            scores += hash_jitter(seed_key, pool_ids, self.current_jitter_epoch())
+        else:
+            scores += self._rng.integers(JITTER_MIN, JITTER_MAX + 1, size=len(scores))
+
+        return scores, reasons
+
+    def _candidate_reasons(self, catalog, seed_codes, positions):
+        """Full reason masks (rules + same seller) for candidates of one seed."""
+        same_seller = (catalog.codes["seller"][positions] == seed_codes["seller"]) \
+            & (seed_codes["seller"] >= 0)
+        return self._rule_reasons(catalog, seed_codes, positions) \
+            | same_seller * np.uint8(REASON_SAME_SELLER)
+
+    def _score_candidates(self, catalog, seed, positions):
+        """
+        Score how well every candidate at the given row positions matches
+        the seed item. Returns (scores, reasons): an integer array (higher =
+        better match) and the matching reason masks.
+        """
+        seed_codes = catalog.seed_codes(seed)
+        rule_reasons = self._rule_reasons(catalog, seed_codes, positions)
+        return self._seed_scores(
+            self._seed_key(seed), seed_codes["seller"],
+            catalog.ids[positions], catalog.codes["seller"][positions], rule_reasons,
+        )
+
+    @staticmethod
+    def _seed_key(seed):
+        """Jitter key of a seed: its id, or a hash of a virtual seed's attributes."""
+        if seed["id"] is not None:
+            return seed["id"]
+        text = "|".join(str(seed[col]) for col in VIRTUAL_SEED_FIELDS)
+        return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+    @staticmethod
+    def _virtual_seed(attributes):
+        """
+        A seed dict for an item described only by attributes (see
+        VIRTUAL_SEED_FIELDS). Missing attributes get the catalog's fill
+        defaults; it has no id, seller or price.
+        """
+        seed = {col: attributes.get(col) or FILL_DEFAULTS.get(col) for col in VIRTUAL_SEED_FIELDS}
+        seed.update({
+            "id":                 None,
+            "productDisplayName": attributes.get("productDisplayName") or "Your item",
+            "seller":             None,
+            "price":              0,
+            "condition":          attributes.get("condition"),
+        })
+        return seed
+
+    @staticmethod
+    def _attributes_key(attributes):
+        """Hashable cache key for an attribute dict."""
+        return tuple(
+            (col, attributes.get(col))
+            for col in VIRTUAL_SEED_FIELDS + ["productDisplayName", "condition"]
+        )
+
+    @staticmethod
+    def _pick_diverse(catalog, positions, scores, num_matches):
+        """
+        Indices (into positions) of the best num_matches candidates, best
+        first, allowing at most 2 of the same article type.
+        """
+        order = top_k(scores, num_matches * 3)  # take a larger sample first
+        seen_types = {}
+        picked = []
+        for idx, atype in zip(order, catalog.codes["articleType"][positions[order]].tolist()):
+            seen_types[atype] = seen_types.get(atype, 0) + 1
+            if seen_types[atype] > 2:
+                continue  # max 2 of the same article type
+            picked.append(idx)
+            if len(picked) >= num_matches:
+                break
+        return np.array(picked, dtype=np.intp)
+
+    @staticmethod
+    def _build_explanation(reasons, seed_colour, colour, usage):
+        """Generate a short human-readable explanation for the match."""
+        return explanation_template(reasons).format(
+            seed_colour=seed_colour, colour=colour, usage=usage
+        )
 
     def get_matches(self, item_id, num_matches=6):
         """
         Find num_matches complementary items for a given item_id.
-        Returns a list of dicts with item info + score + explanation.
+        Returns a list of Match tuples (item info + score + explanation).
+        """
+        return self._cached("matches", self._get_matches, item_id, num_matches)
+
+    def get_matches_for_attributes(self, attributes, num_matches=6):
         """
-        seed = self._get_item(item_id)
-        if seed is None:
+        Like get_matches, for an item that isn't in the catalog (e.g. an
+        uploaded one), described by an attribute dict with the
+        VIRTUAL_SEED_FIELDS keys.
+        """
+        key = self._attributes_key(attributes)
+        return self._cached("attribute_matches", self._get_attribute_matches, key, num_matches)
+
+    def _get_matches(self, catalog, item_id, num_matches):
+        """Uncached get_matches against the given catalog."""
+        seed_pos = catalog.item_position(item_id)
+        if seed_pos is None:
             print(f"Item {item_id} not found.")
             return []
+        seed = catalog.df.iloc[seed_pos]
+        return self._seed_matches(catalog, seed, num_matches, seed_pos)
 
+    def _get_attribute_matches(self, catalog, key, num_matches):
+        """Uncached get_matches_for_attributes against the given catalog."""
+        return self._seed_matches(catalog, self._virtual_seed(dict(key)), num_matches)
+
+    def _seed_matches(self, catalog, seed, num_matches, seed_pos=None):
+        """Matches for a catalog seed (at seed_pos) or a virtual one (seed_pos=None)."""
         seed_article = seed["articleType"]
-        compatible_types = CATEGORY_COMPAT.get(seed_article, [])
+        compatible_types = catalog.rules.category.get(seed_article, ())
 
         if not compatible_types:
             print(f"No compatibility rules defined for: {seed_article}")
             return []
 
-        # Hard filter: gender + compatible article types
-        pool = self._gender_filter(seed["gender"])
-        pool = pool[pool["articleType"].isin(compatible_types)]
-        pool = pool[pool["id"] != item_id]  # exclude the seed itself
+        # Precomputed recommendations, when available and still valid
+        if seed_pos is not None:
+            stored = self._stored_matches(catalog, seed["id"], num_matches)
+            if stored is not None:
+                positions, scores = stored
+                reasons = self._candidate_reasons(catalog, catalog.seed_codes(seed), positions)
+                return self._match_results(catalog, seed, positions, scores, reasons)
+
+        # Hard filter: gender + compatible article types, minus the seed itself
+        positions = catalog.candidate_pool(seed["gender"], compatible_types, exclude=seed_pos)
 
-        if pool.empty:
+        if len(positions) == 0:
             return []
 
         # Score all candidates
-        pool = pool.copy()
-        pool["_score"] = pool.apply(
-            lambda row: self._score_candidate(seed, row), axis=1
-        )
+        scores, reasons = self._score_candidates(catalog, seed, positions)
 
-        # Sort by score descending
-        pool = pool.sort_values("_score", ascending=False)
+        # Best-scoring candidates, with variety in article types (avoid 3
+        # identical types) — no full sort of the pool needed
+        picked = self._pick_diverse(catalog, positions, scores, num_matches)
+        return self._match_results(
+            catalog, seed, positions[picked], scores[picked], reasons[picked]
+        )
 
-        # Pick top num_matches
-        top = pool.head(num_matches * 3)  # take a larger sample first
+    def _match_results(self, catalog, seed, positions, scores, reasons):
+        """Build the Match results for matches at the given row positions."""
+        seed_colour = seed["baseColour"]
+        return [
+            Match(item_id, name, article, sub, colour, seller, price, condition, score,
+                  self._build_explanation(mask, seed_colour, colour, usage),
+                  reason_names(mask))
+            for (item_id, name, article, sub, colour, seller, price, condition, usage,
+                 score, mask)
+            in zip(*catalog.column_values(positions, MATCH_COLUMNS + ["usage"]),
+                   scores.tolist(), reasons.tolist())
+        ]
+
+    def _reopen_recommendations(self):
+        """Switch to the store's latest build once refresh_store published one."""
+        store = self.recommendations
+        if store is not None:
+            self.recommendations = store.reopened()
+
+    def _store_current(self, catalog, store):
+        """
+        Whether the store was computed from this catalog's files (and no
+        deltas it hasn't seen), with the jitter and rules a live request
+        would use.
+        """
+        return (
+            self.jitter == "hash"
+            and store.catalog_stamp == catalog.stamp
+            and store.catalog_deltas <= catalog.delta_count
+            and store.jitter_epoch == self.current_jitter_epoch()
+            and store.rules == catalog.rules.fingerprint
+        )
 
-        # Try to get variety in article types (avoid 3 identical types)
-        seen_types = {}
-        results = []
-        for _, row in top.iterrows():
-            atype = row["articleType"]
-            seen_types[atype] = seen_types.get(atype, 0) + 1
-            if seen_types[atype] > 2:
-                continue  # max 2 of the same article type
-            explanation = self._build_explanation(seed, row, row["_score"])
-            results.append({
-                "id":          row["id"],
-                "name":        row["productDisplayName"],
-                "articleType": atype,
-                "subCategory": row["subCategory"],
-                "colour":      row["baseColour"],
-                "seller":      row["seller"],
-                "price":       row["price"],
-                "condition":   row["condition"],
-                "score":       int(row["_score"]),
-                "explanation": explanation,
-                "image_path":  f"data/images/{row['id']}.jpg",
-            })
-            if len(results) >= num_matches:
-                break
+    def _stored_matches(self, catalog, item_id, num_matches):
+        """
+        Row positions and scores of precomputed matches for item_id, or None
+        when they must be computed live (no store, seed not in it, or the
+        seed or a stored match was changed by a delta or is no longer
+        listed).
+        """
+        store = self.recommendations
+        if store is None or num_matches > store.num_matches \
+                or not self._store_current(catalog, store):
+            return None
+        changed = catalog.changed_ids(store.catalog_deltas)
+        stored = store.matches(item_id) if item_id not in changed else None
+        if stored is None:
+            return None
+        ids, scores = stored
+        if changed and not changed.isdisjoint(ids[:num_matches].tolist()):
+            return None
+        positions = catalog.positions_of(ids[:num_matches])
+        if positions is None:
+            return None
+        return positions, scores[:num_matches]
 
-        return results
+    def _stored_bundle(self, catalog, item_id, roles_needed):
+        """
+        Precomputed (role, row position) picks for roles_needed, or None
+        when the bundle must be computed live (see _stored_matches).
+        """
+        store = self.recommendations
+        if store is None or not self._store_current(catalog, store):
+            return None
+        changed = catalog.changed_ids(store.catalog_deltas)
+        stored = store.bundle(item_id) if item_id not in changed else None
+        if stored is None:
+            return None
+        picks = []
+        for role in roles_needed:
+            if role in stored:
+                if stored[role] in changed:
+                    return None
+                pos = catalog.item_position(stored[role])
+                if pos is None:
+                    return None
+                picks.append((role, pos))
+        return picks
+
+    @staticmethod
+    def _bundle_items(catalog, picks, is_seed=False):
+        """BundleItems for (role, row position) picks, in order."""
+        positions = np.array([pos for _, pos in picks], dtype=np.intp)
+        return [
+            BundleItem(item_id, name, article, role, colour, seller, price, condition, is_seed)
+            for (role, _), (item_id, name, article, colour, seller, price, condition)
+            in zip(picks, zip(*catalog.column_values(positions, BUNDLE_COLUMNS)))
+        ]
 
     def get_outfit_bundle(self, item_id, num_items=4):
         """
         Build a complete outfit around item_id.
         Guarantees one item per outfit role (top, bottom, shoes, accessory).
-        Returns a list of dicts.
+        Returns a list of BundleItem tuples, the seed first.
+        """
+        return self._cached("bundle", self._get_outfit_bundle, item_id, num_items)
+
+    def get_outfit_bundle_for_attributes(self, attributes, num_items=4):
         """
-        seed = self._get_item(item_id)
-        if seed is None:
+        Like get_outfit_bundle, for an item described by an attribute dict
+        (see get_matches_for_attributes). The seed entry has id None.
+        """
+        key = self._attributes_key(attributes)
+        return self._cached("attribute_bundle", self._get_attribute_bundle, key, num_items)
+
+    def _get_outfit_bundle(self, catalog, item_id, num_items):
+        """Uncached get_outfit_bundle against the given catalog."""
+        seed_pos = catalog.item_position(item_id)
+        if seed_pos is None:
             return []
+        seed = catalog.df.iloc[seed_pos]
+        return self._seed_bundle(catalog, seed, num_items, seed_pos)
 
+    def _get_attribute_bundle(self, catalog, key, num_items):
+        """Uncached get_outfit_bundle_for_attributes against the given catalog."""
+        return self._seed_bundle(catalog, self._virtual_seed(dict(key)), num_items)
+
+    def _seed_bundle(self, catalog, seed, num_items, seed_pos=None):
+        """Bundle around a catalog seed (at seed_pos) or a virtual one (seed_pos=None)."""
         seed_article = seed["articleType"]
-        seed_role = ARTICLE_ROLES.get(seed_article, "other")
+        seed_role = catalog.rules.article_roles.get(seed_article, "other")
 
         # Start the bundle with the seed item
-        bundle = [{
-            "id":          seed["id"],
-            "name":        seed["productDisplayName"],
-            "articleType": seed_article,
-            "role":        seed_role,
-            "colour":      seed["baseColour"],
-            "seller":      seed["seller"],
-            "price":       seed["price"],
-            "condition":   seed["condition"],
-            "image_path":  f"data/images/{seed['id']}.jpg",
-            "is_seed":     True,
-        }]
-
-        filled_roles = {seed_role}
-
-        # Gender-compatible pool
-        pool = self._gender_filter(seed["gender"])
-        pool = pool[pool["id"] != item_id].copy()
-
-        # Score the whole pool against seed
-        pool["_score"] = pool.apply(
-            lambda row: self._score_candidate(seed, row), axis=1
-        )
-        pool = pool.sort_values("_score", ascending=False)
+        if seed_pos is not None:
+            bundle = self._bundle_items(catalog, [(seed_role, seed_pos)], is_seed=True)
+        else:
+            bundle = [BundleItem(None, seed["productDisplayName"], seed_article, seed_role,
+                                 seed["baseColour"], None, seed["price"], seed["condition"],
+                                 True)]
 
         # Fill one slot per role in priority order
-        roles_needed = [r for r in OUTFIT_ROLE_ORDER if r not in filled_roles]
+        roles_needed = [r for r in OUTFIT_ROLE_ORDER if r != seed_role]
         roles_needed = roles_needed[: num_items - 1]  # -1 because seed already added
 
+        # Precomputed recommendations, when available and still valid
+        picks = None
+        if seed_pos is not None:
+            picks = self._stored_bundle(catalog, seed["id"], roles_needed)
+        if picks is not None:
+            return bundle + self._bundle_items(catalog, picks)
+
+        picks = []
         for role in roles_needed:
-            # Get article types that belong to this role
-            role_types = [art for art, r in ARTICLE_ROLES.items() if r == role]
+            role_types = catalog.rules.role_types(seed_article, role)
 
-            # Also filter by compatibility with seed article type
-            compatible_types = CATEGORY_COMPAT.get(seed_article, [])
-            if compatible_types:
-                role_types = [t for t in role_types if t in compatible_types]
+            # Only score the gender-compatible items of this role. Roles have
+            # disjoint article types, so an item can't be picked twice.
+            positions = catalog.candidate_pool(seed["gender"], role_types, exclude=seed_pos)
 
-            # If no compatible types found for this role, use any type in that role
-            if not role_types:
-                role_types = [art for art, r in ARTICLE_ROLES.items() if r == role]
+            if len(positions) == 0:
+                continue
 
-            candidates = pool[pool["articleType"].isin(role_types)]
+            # Pick the top scorer for this role (top-1, no sort needed)
+            scores, _ = self._score_candidates(catalog, seed, positions)
+            picks.append((role, positions[int(np.argmax(scores))]))
 
-            if candidates.empty:
-                continue
+        return bundle + self._bundle_items(catalog, picks)
 
-            # Pick the top scorer for this role
-            best = candidates.iloc[0]
-            bundle.append({
-                "id":          best["id"],
-                "name":        best["productDisplayName"],
-                "articleType": best["articleType"],
-                "role":        role,
-                "colour":      best["baseColour"],
-                "seller":      best["seller"],
-                "price":       best["price"],
-                "condition":   best["condition"],
-                "image_path":  f"data/images/{best['id']}.jpg",
-                "is_seed":     False,
-            })
-
-            # Remove this item from pool so we don't pick it again
-            pool = pool[pool["id"] != best["id"]]
-            filled_roles.add(role)
-
-        return bundle
+    def _seed_groups(self, catalog, item_ids):
+        """
+        Resolve item_ids to row positions (unknown ids are dropped) and
+        group them by the attributes that decide their candidate pools and
+        rule scores. Yields (group key, seed positions) pairs.
+        """
+        positions = [catalog.item_position(i) for i in item_ids]
+        positions = np.array([p for p in positions if p is not None], dtype=np.intp)
+        if len(positions) == 0:
+            return
+        seeds = catalog.df.take(positions).reset_index(drop=True)
+        groups = seeds.groupby(BATCH_GROUP_COLUMNS, sort=False, observed=True).indices
+        for key, members in groups.items():
+            yield dict(zip(BATCH_GROUP_COLUMNS, key)), positions[members]
+
+    def get_matches_batch(self, item_ids, num_matches=6):
+        """
+        get_matches for many seeds at once, e.g. for precomputing shelves.
+
+        Seeds sharing (gender, articleType, colour, usage, season) share one
+        candidate pool and one set of rule scores; only the same-seller
+        boost and jitter are computed per seed. Returns a DataFrame with one
+        row per match: seed_id, rank (0 = best), id, score. Unknown ids and
+        seeds without compatibility rules are omitted.
+        """
+        catalog = self.catalog
+        ids = catalog.df["id"].to_numpy()
+        out_seed, out_rank, out_pos, out_score = [], [], [], []
+
+        for attrs, seed_positions in self._seed_groups(catalog, item_ids):
+            compatible_types = catalog.rules.category.get(attrs["articleType"], ())
+            if not compatible_types:
+                continue
+            pool = catalog.candidate_pool(attrs["gender"], compatible_types)
+            if len(pool) == 0:
+                continue
+            rule_reasons = self._rule_reasons(catalog, catalog.seed_codes(attrs), pool)
+            pool_ids = catalog.ids[pool]
+            pool_sellers = catalog.codes["seller"][pool]
+
+            for seed_pos in seed_positions:
+                scores, _ = self._seed_scores(
+                    catalog.ids[seed_pos], catalog.codes["seller"][seed_pos],
+                    pool_ids, pool_sellers, rule_reasons,
+                )
+                keep = np.flatnonzero(pool != seed_pos)  # exclude the seed itself
+                picked = keep[self._pick_diverse(catalog, pool[keep], scores[keep], num_matches)]
+                out_seed.append(np.full(len(picked), seed_pos, dtype=np.intp))
+                out_rank.append(np.arange(len(picked), dtype=np.int16))
+                out_pos.append(pool[picked])
+                out_score.append(scores[picked])
+
+        return self._batch_frame(ids, out_seed, out_pos, out_score, rank=out_rank)
+
+    def get_outfit_bundles_batch(self, item_ids, num_items=4):
+        """
+        get_outfit_bundle for many seeds at once. Seeds are grouped like in
+        get_matches_batch, so each role pool is built and rule-scored once
+        per group. Returns a DataFrame with one row per picked (non-seed)
+        piece: seed_id, role, id, score.
+        """
+        catalog = self.catalog
+        ids = catalog.df["id"].to_numpy()
+        out_seed, out_role, out_pos, out_score = [], [], [], []
+
+        for attrs, seed_positions in self._seed_groups(catalog, item_ids):
+            seed_role = catalog.rules.article_roles.get(attrs["articleType"], "other")
+            roles_needed = [r for r in OUTFIT_ROLE_ORDER if r != seed_role][: num_items - 1]
+            seed_codes = catalog.seed_codes(attrs)
+
+            for role in roles_needed:
+                pool = catalog.candidate_pool(
+                    attrs["gender"], catalog.rules.role_types(attrs["articleType"], role)
+                )
+                if len(pool) == 0:
+                    continue
+                rule_reasons = self._rule_reasons(catalog, seed_codes, pool)
+                pool_ids = catalog.ids[pool]
+                pool_sellers = catalog.codes["seller"][pool]
+
+                for seed_pos in seed_positions:
+                    scores, _ = self._seed_scores(
+                        catalog.ids[seed_pos], catalog.codes["seller"][seed_pos],
+                        pool_ids, pool_sellers, rule_reasons,
+                    )
+                    scores[pool == seed_pos] = -1  # never pick the seed itself
+                    best = int(np.argmax(scores))
+                    if scores[best] < 0:
+                        continue
+                    out_seed.append(np.array([seed_pos], dtype=np.intp))
+                    out_role.append(role)
+                    out_pos.append(pool[best:best + 1])
+                    out_score.append(scores[best:best + 1])
+
+        frame = self._batch_frame(ids, out_seed, out_pos, out_score)
+        frame.insert(1, "role", pd.Categorical(out_role, categories=OUTFIT_ROLE_ORDER))
+        # Rows come out role by role within each group; put each seed's together
+        return frame.sort_values(["seed_id", "role"], kind="stable", ignore_index=True)
+
+    @staticmethod
+    def _batch_frame(ids, seed_parts, pos_parts, score_parts, rank=None):
+        """Assemble batch results into a compact seed_id/(rank)/id/score frame."""
+        def cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+        frame = {"seed_id": ids[cat(seed_parts, np.intp)]}
+        if rank is not None:
+            frame["rank"] = cat(rank, np.int16)
+        frame["id"] = ids[cat(pos_parts, np.intp)]
+        frame["score"] = cat(score_parts, np.int16)
+        return pd.DataFrame(frame)
 
     def get_total_price(self, bundle):
         """Calculate total price of an outfit bundle."""
-        return sum(item["price"] for item in bundle)
+        return sum(item.price for item in bundle)
 
     def get_same_seller_items(self, bundle):
         """Return items in the bundle that share the seed seller."""
-        if not bundle:
+        if not bundle or bundle[0].seller is None:
             return []
-        seed_seller = bundle[0]["seller"]
-        return [item for item in bundle if item["seller"] == seed_seller]
+        seed_seller = bundle[0].seller
+        return [item for item in bundle if item.seller == seed_seller]
 
 
 # ---------------------------------------------------------------------------
 # Quick test — run this file directly to check everything works
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quick check of the matching engine.")
+    parser.add_argument("--write-rules", metavar="PATH",
+                        help="write the rule tables in use to a JSON rules file and exit")
+    args = parser.parse_args()
+
     matcher = OutfitMatcher()
 
+    if args.write_rules:
+        matcher.catalog.rules.save(args.write_rules)
+        print(f"Wrote rule tables to {args.write_rules}.")
+        sys.exit()
+
+    report = matcher.memory_report()
+    print(f"Catalog memory: {report['total'] / 1e6:.1f} MB for {report['rows']:,} items")
+
+    for issue, entries in matcher.catalog.rule_report.items():
+        print(f"  Rule check — {issue}: {', '.join(entries)}")
+
     # Grab a random item from the catalog to test with
     test_item = matcher.df.sample(1).iloc[0]
     test_id = test_item["id"]
@@ -553,9 +2127,9 @@ if __name__ == "__main__":
     matches = matcher.get_matches(test_id, num_matches=6)
     if matches:
         for i, m in enumerate(matches, 1):
-            print(f"  {i}. [{m['articleType']}] {m['name'][:50]}")
-            print(f"       €{m['price']} | {m['colour']} | Score: {m['score']}")
-            print(f"       Why: {m['explanation']}")
+            print(f"  {i}. [{m.articleType}] {m.name[:50]}")
+            print(f"       €{m.price} | {m.colour} | Score: {m.score}")
+            print(f"       Why: {m.explanation}")
     else:
         print("  No matches found — check compatibility rules for this article type.")
 
@@ -563,8 +2137,8 @@ if __name__ == "__main__":
     bundle = matcher.get_outfit_bundle(test_id, num_items=4)
     total = matcher.get_total_price(bundle)
     for item in bundle:
-        seed_tag = " ← seed" if item["is_seed"] else ""
-        print(f"  [{item['role']}] {item['name'][:50]} | €{item['price']}{seed_tag}")
+        seed_tag = " ← seed" if item.is_seed else ""
+        print(f"  [{item.role}] {item.name[:50]} | €{item.price}{seed_tag}")
     print(f"  Total outfit price: €{total}")
 
     same_seller = matcher.get_same_seller_items(bundle)
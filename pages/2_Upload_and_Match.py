@@ -7,11 +7,14 @@ import streamlit as st
 from PIL import Image
 import os
 import sys
-import json
-import cohere
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from image_store import ImageStore
+from item_parser import (
+    ARTICLE_TYPES, COLOURS, GENDERS, OCCASIONS, SEASONS, CohereLLM, ItemParser, keyword_parse,
+)
 from matching_engine import OutfitMatcher
+from recommendation_store import RecommendationStore
 
 st.set_page_config(
     page_title="Upload & Match — Vinted",
@@ -80,19 +83,7 @@ hr { border-color: #ebebeb !important; margin: 24px 0 !important; }
 # ─────────────────────────────────────────────
 # CONSTANTS
 # ─────────────────────────────────────────────
-ARTICLE_TYPES = sorted([
-    "Tshirts", "Shirts", "Casual Shoes", "Watches", "Sports Shoes",
-    "Kurtas", "Tops", "Handbags", "Heels", "Sunglasses", "Wallets",
-    "Flip Flops", "Sandals", "Belts", "Backpacks", "Socks",
-    "Formal Shoes", "Jeans", "Shorts", "Trousers", "Jackets",
-    "Sweaters", "Sweatshirts", "Blazers", "Dresses", "Skirts",
-    "Leggings", "Track Pants", "Sports Sandals", "Capris",
-    "Earrings", "Necklace and Chains", "Bracelet", "Scarves", "Caps",
-])
-COLOURS    = sorted(["Black", "White", "Blue", "Brown", "Grey", "Red", "Green", "Pink", "Navy Blue", "Purple", "Silver", "Yellow", "Beige", "Gold", "Maroon", "Orange", "Olive", "Multi", "Cream"])
-OCCASIONS  = ["Casual", "Formal", "Sports", "Ethnic", "Smart Casual", "Party", "Travel"]
-SEASONS    = ["Summer", "Fall", "Winter", "Spring"]
-GENDERS    = ["Men", "Women", "Unisex"]
+# Item types, colours, occasions, seasons and genders come from item_parser
 CONDITIONS = ["New", "Like new", "Good", "Fair"]
 
 def get_cohere_api_key() -> str:
@@ -102,23 +93,26 @@ def get_cohere_api_key() -> str:
         return os.getenv("COHERE_API_KEY", "")
 
 COHERE_API_KEY = get_cohere_api_key()
-IMAGE_DIR = "data/images"
+# Optional Cohere-compatible endpoint, e.g. a local mock for testing
+COHERE_BASE_URL = os.getenv("COHERE_BASE_URL") or None
 
 # ─────────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────────
 @st.cache_resource(show_spinner="Loading catalog...")
 def load_matcher():
-    return OutfitMatcher()
+    # Serve precomputed recommendations when recommendation_store.py has run;
+    # catalog and rule file changes are picked up in the background
+    return OutfitMatcher(recommendations=RecommendationStore.open(), watch_interval=30)
+
+@st.cache_resource
+def load_images():
+    # Prebuilt thumbnails (image_store.py) behind a shared byte cache, read
+    # from the packed archive when one was built
+    return ImageStore()
 
-def get_catalog_image(item_id):
-    path = os.path.join(IMAGE_DIR, f"{int(item_id)}.jpg")
-    if os.path.exists(path):
-        try:
-            return Image.open(path)
-        except Exception:
-            return None
-    return None
+def get_catalog_image(item_id, size="grid"):
+    return load_images().get(item_id, size)
 
 def condition_badge(cond):
     mapping = {
@@ -146,35 +140,86 @@ def navbar():
         st.page_link("app.py", label="🏠 Browse")
         st.page_link("pages/2_Upload_and_Match.py", label="📸 Upload & Match")
 
-def parse_with_cohere(description: str) -> dict:
-    if not COHERE_API_KEY:
-        raise RuntimeError("COHERE_API_KEY is not set. Add it to Streamlit secrets or an environment variable.")
-    client = cohere.ClientV2(api_key=COHERE_API_KEY)
-    prompt = f"""You are a fashion item classifier. Extract clothing attributes from this description.
-
-Description: "{description}"
-
-Return ONLY a JSON object with exactly these keys (no explanation, no markdown, just JSON):
-{{
-  "articleType": one of {ARTICLE_TYPES},
-  "baseColour": one of {COLOURS},
-  "usage": one of {OCCASIONS},
-  "season": one of {SEASONS},
-  "gender": one of {GENDERS}
-}}
-
-If unsure about a field, pick the closest match from the allowed values. Never return null."""
-
-    response = client.chat(
-        model="command-r-plus-08-2024",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    raw = response.message.content[0].text.strip()
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    return json.loads(raw.strip())
+@st.cache_resource
+def load_parser():
+    # One Cohere client (connection pool) for all sessions; offline keyword
+    # parsing and the parse cache are tried before it (see item_parser.py)
+    llm = None
+    if COHERE_API_KEY or COHERE_BASE_URL:
+        llm = CohereLLM(COHERE_API_KEY or "local", base_url=COHERE_BASE_URL)
+    return ItemParser(llm)
+
+# Text form: parsed field -> (widget key, value when nothing was parsed)
+TEXT_FORM_FIELDS = {
+    "articleType": ("t_type",     ARTICLE_TYPES[0]),
+    "baseColour":  ("t_colour",   COLOURS[0]),
+    "gender":      ("t_gender",   "Unisex"),
+    "usage":       ("t_occasion", "Casual"),
+    "season":      ("t_season",   "Summer"),
+}
+
+def apply_parsed(parsed: dict):
+    """Fill the text form from parsed fields, keeping fields the user has changed."""
+    filled = st.session_state.parse_filled
+    for field, (key, default) in TEXT_FORM_FIELDS.items():
+        current = st.session_state.get(key)
+        if current is not None and current != filled.get(key):
+            continue
+        value = parsed.get(field, current if current is not None else default)
+        st.session_state[key] = value
+        filled[key] = value
+
+def text_form_desc() -> dict:
+    desc = {field: st.session_state[key] for field, (key, _) in TEXT_FORM_FIELDS.items()}
+    desc["condition"] = st.session_state.get("t_condition", CONDITIONS[0])
+    return desc
+
+def start_parse(description: str):
+    for key, _ in TEXT_FORM_FIELDS.values():
+        st.session_state.pop(key, None)
+    st.session_state.parse_filled = {}
+    st.session_state.parse_error = None
+
+    future = load_parser().parse_async(description)
+    if future.done():
+        finish_parse(future)
+        return
+
+    # While the LLM works, match on whatever the keywords recognised
+    fields, _ = keyword_parse(description)
+    apply_parsed(fields)
+    st.session_state.cohere_parsed = fields
+    st.session_state.parse_future = future
+    if "articleType" in fields:
+        # Only what was recognised — fields still being parsed are unknown
+        # (None), not the form's defaults
+        st.session_state.item_desc = {field: fields.get(field) for field in TEXT_FORM_FIELDS}
+        st.session_state.item_desc["condition"] = None
+        st.session_state.show_results = True
+
+def finish_parse(future):
+    st.session_state.parse_future = None
+    try:
+        parsed = future.result()
+    except Exception as e:
+        st.session_state.parse_error = f"Could not parse description: {e}"
+        return
+    apply_parsed(parsed)
+    st.session_state.cohere_parsed = parsed
+    # Refresh results shown from the speculative fields
+    if st.session_state.show_results:
+        st.session_state.item_desc = text_form_desc()
+
+@st.fragment(run_every=0.5)
+def poll_parse():
+    future = st.session_state.parse_future
+    if future is None:
+        return
+    if not future.done():
+        st.markdown('<div style="font-size:13px;color:#007782;margin:8px 0;">✦ AI is reading your description — results use what we recognised so far…</div>', unsafe_allow_html=True)
+        return
+    finish_parse(future)
+    st.rerun()
 
 
 def show_results(item_desc: dict, uploaded_image=None):
@@ -202,30 +247,7 @@ def show_results(item_desc: dict, uploaded_image=None):
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    df = matcher.df
-    candidates = df.copy()
-    if item_desc.get("gender") and item_desc["gender"] != "Unisex":
-        gender_compat = {"Men": ["Men", "Unisex"], "Women": ["Women", "Unisex"]}
-        candidates = candidates[candidates["gender"].isin(
-            gender_compat.get(item_desc["gender"], [item_desc["gender"], "Unisex"])
-        )]
-    if item_desc.get("articleType"):
-        type_match = candidates[candidates["articleType"] == item_desc["articleType"]]
-        if len(type_match) > 0:
-            candidates = type_match
-
-    if len(candidates) == 0:
-        st.warning("No items found matching your description. Try adjusting the fields.")
-        return
-
-    if item_desc.get("baseColour"):
-        colour_match = candidates[candidates["baseColour"] == item_desc["baseColour"]]
-        if len(colour_match) > 0:
-            candidates = colour_match
-
-    seed_row = candidates.sample(1, random_state=42).iloc[0]
-    seed_id = seed_row["id"]
-
+    # The described item itself is the seed — no proxy catalog item needed
     tab1, tab2 = st.tabs(["✨ Match with", "👗 Build complete outfit"])
 
     with tab1:
@@ -233,7 +255,7 @@ def show_results(item_desc: dict, uploaded_image=None):
         st.markdown('<div style="font-size:13px;color:#888;margin-bottom:20px;">Based on colour harmony, occasion, and style compatibility</div>', unsafe_allow_html=True)
 
         with st.spinner("Finding matches..."):
-            matches = matcher.get_matches(seed_id, num_matches=6)
+            matches = matcher.get_matches_for_attributes(item_desc, num_matches=6)
 
         if not matches:
             st.info("No matches found. Try a different item type.")
@@ -241,8 +263,7 @@ def show_results(item_desc: dict, uploaded_image=None):
             cols = st.columns(3)
             for i, match in enumerate(matches):
                 with cols[i % 3]:
-                    match_img = get_catalog_image(match["id"])
-                    same_seller = match["seller"] == seed_row["seller"]
+                    match_img = get_catalog_image(match.id)
                     st.markdown('<div class="match-card">', unsafe_allow_html=True)
                     if match_img:
                         st.image(match_img, width="stretch")
@@ -250,14 +271,12 @@ def show_results(item_desc: dict, uploaded_image=None):
                         st.markdown('<div style="background:#f0f0f0;height:160px;display:flex;align-items:center;justify-content:center;font-size:40px;">👚</div>', unsafe_allow_html=True)
                     st.markdown(f"""
                     <div class="match-card-body">
-                        <div style="font-size:16px;font-weight:700;">€{match['price']}</div>
-                        <div style="font-size:12px;color:#555;margin-top:2px;">{match['name'][:45]}</div>
-                        <div class="match-why">✦ {match['explanation']}</div>
-                        {condition_badge(match['condition'])}
+                        <div style="font-size:16px;font-weight:700;">€{match.price}</div>
+                        <div style="font-size:12px;color:#555;margin-top:2px;">{match.name[:45]}</div>
+                        <div class="match-why">✦ {match.explanation}</div>
+                        {condition_badge(match.condition)}
                     </div>
                     """, unsafe_allow_html=True)
-                    if same_seller:
-                        st.markdown('<div class="same-seller-banner">📦 Same seller — bundle & save!</div>', unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
                     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -266,13 +285,13 @@ def show_results(item_desc: dict, uploaded_image=None):
         st.markdown('<div style="font-size:13px;color:#888;margin-bottom:20px;">One piece per role — top, bottom, shoes, and accessory</div>', unsafe_allow_html=True)
 
         with st.spinner("Building your outfit..."):
-            bundle = matcher.get_outfit_bundle(seed_id, num_items=4)
+            bundle = matcher.get_outfit_bundle_for_attributes(item_desc, num_items=4)
 
         if not bundle:
             st.info("Could not build a full outfit for this item type.")
         else:
+            # Your own item isn't for sale, so this is what the rest costs
             total_price = matcher.get_total_price(bundle)
-            same_seller_items = matcher.get_same_seller_items(bundle)
 
             st.markdown(f"""
             <div style="background:#f0f9f9;border:1px solid #b2dfdb;border-radius:12px;
@@ -282,40 +301,32 @@ def show_results(item_desc: dict, uploaded_image=None):
                     <div style="font-size:13px;color:#555;">Complete outfit total</div>
                     <div style="font-size:20px;font-weight:700;color:#007782;">€{total_price}</div>
                 </div>
-                <div style="font-size:13px;color:#007782;font-weight:500;">
-                    {len(same_seller_items)} item(s) from same seller 📦
-                </div>
             </div>
             """, unsafe_allow_html=True)
 
             cols = st.columns(len(bundle))
             for col, piece in zip(cols, bundle):
                 with col:
-                    piece_img = get_catalog_image(piece["id"])
-                    is_seed = piece.get("is_seed", False)
+                    is_seed = piece.is_seed
+                    # The seed is the user's own item: show their photo, if any
+                    piece_img = uploaded_image if is_seed else get_catalog_image(piece.id)
                     border = "2px solid #09a89e" if is_seed else "1px solid #ebebeb"
                     st.markdown(f'<div style="background:#fff;border-radius:12px;border:{border};overflow:hidden;">', unsafe_allow_html=True)
                     if piece_img:
                         st.image(piece_img, width="stretch")
                     else:
                         st.markdown('<div style="background:#f0f0f0;height:140px;display:flex;align-items:center;justify-content:center;font-size:36px;">👕</div>', unsafe_allow_html=True)
-                    role_label = piece["role"].capitalize()
+                    role_label = piece.role.capitalize()
                     seed_label = " · Your item" if is_seed else ""
                     st.markdown(f"""
                     <div style="padding:10px 12px 14px;">
                         <div style="font-size:10px;font-weight:600;color:#09a89e;text-transform:uppercase;">{role_label}{seed_label}</div>
-                        <div style="font-size:12px;color:#555;margin-top:2px;">{piece['name'][:40]}</div>
-                        <div style="font-size:15px;font-weight:700;margin-top:4px;">€{piece['price']}</div>
+                        <div style="font-size:12px;color:#555;margin-top:2px;">{piece.name[:40]}</div>
+                        <div style="font-size:15px;font-weight:700;margin-top:4px;">{"Yours" if is_seed else f"€{piece.price}"}</div>
                     </div>
                     """, unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
 
-            if len(same_seller_items) > 1:
-                with st.expander("💡 Bundle tip — save on shipping"):
-                    st.write(f"**{len(same_seller_items)} items** are from the same seller.")
-                    for si in same_seller_items:
-                        st.write(f"  • {si['name'][:50]} — €{si['price']}")
-
 
 # ─────────────────────────────────────────────
 # SESSION STATE
@@ -323,6 +334,7 @@ def show_results(item_desc: dict, uploaded_image=None):
 for key, default in [
     ("upload_option", None), ("item_desc", None), ("uploaded_image", None),
     ("cohere_parsed", None), ("show_results", False),
+    ("parse_future", None), ("parse_error", None), ("parse_filled", {}),
 ]:
     if key not in st.session_state:
         st.session_state[key] = default
@@ -456,48 +468,41 @@ if st.session_state.upload_option:
         description = st.text_area("desc", placeholder="e.g. dark blue slim fit casual jeans for men...", height=100, label_visibility="collapsed")
 
         if st.button("🤖 Parse with AI", key="parse_cohere") and description.strip():
-            with st.spinner("Analysing with Cohere AI..."):
-                try:
-                    parsed = parse_with_cohere(description)
-                    st.session_state.cohere_parsed = parsed
-                except Exception as e:
-                    st.error(f"Could not parse description: {e}")
-                    st.session_state.cohere_parsed = None
-
-        if st.session_state.cohere_parsed:
-            parsed = st.session_state.cohere_parsed
+            start_parse(description)
+
+        # Non-blocking: the parse runs in the background and is applied when it lands
+        if st.session_state.parse_future is not None:
+            poll_parse()
+        if st.session_state.parse_error:
+            st.error(st.session_state.parse_error)
+
+        if st.session_state.cohere_parsed is not None:
+            pending = st.session_state.parse_future is not None
+            heading = ("✦ Recognised so far — AI is filling in the rest:" if pending
+                       else "✦ AI detected the following — verify and adjust if needed:")
             st.markdown("<br>", unsafe_allow_html=True)
-            st.markdown("""
+            st.markdown(f"""
             <div style="background:#f0f9f9;border:1px solid #b2dfdb;border-radius:10px;padding:16px 20px;margin-bottom:16px;">
                 <div style="font-size:14px;font-weight:600;color:#007782;margin-bottom:8px;">
-                    ✦ AI detected the following — verify and adjust if needed:
+                    {heading}
                 </div>
             </div>
             """, unsafe_allow_html=True)
 
+            # Values come from session state (see apply_parsed)
             c1, c2 = st.columns(2)
             with c1:
-                article_type = st.selectbox("Item type", ARTICLE_TYPES,
-                    index=ARTICLE_TYPES.index(parsed.get("articleType", ARTICLE_TYPES[0])) if parsed.get("articleType") in ARTICLE_TYPES else 0,
-                    key="t_type")
-                colour = st.selectbox("Colour", COLOURS,
-                    index=COLOURS.index(parsed.get("baseColour", COLOURS[0])) if parsed.get("baseColour") in COLOURS else 0,
-                    key="t_colour")
-                gender = st.selectbox("Gender", GENDERS,
-                    index=GENDERS.index(parsed.get("gender", "Unisex")) if parsed.get("gender") in GENDERS else 2,
-                    key="t_gender")
+                st.selectbox("Item type", ARTICLE_TYPES, key="t_type")
+                st.selectbox("Colour", COLOURS, key="t_colour")
+                st.selectbox("Gender", GENDERS, key="t_gender")
             with c2:
-                occasion = st.selectbox("Occasion", OCCASIONS,
-                    index=OCCASIONS.index(parsed.get("usage", "Casual")) if parsed.get("usage") in OCCASIONS else 0,
-                    key="t_occasion")
-                season = st.selectbox("Season", SEASONS,
-                    index=SEASONS.index(parsed.get("season", "Summer")) if parsed.get("season") in SEASONS else 0,
-                    key="t_season")
-                condition = st.selectbox("Condition", CONDITIONS, key="t_condition")
+                st.selectbox("Occasion", OCCASIONS, key="t_occasion")
+                st.selectbox("Season", SEASONS, key="t_season")
+                st.selectbox("Condition", CONDITIONS, key="t_condition")
 
             st.markdown("<br>", unsafe_allow_html=True)
             if st.button("🔍 Find matches", key="submit_text"):
-                st.session_state.item_desc = {"articleType": article_type, "baseColour": colour, "gender": gender, "usage": occasion, "season": season, "condition": condition}
+                st.session_state.item_desc = text_form_desc()
                 st.session_state.show_results = True
 
     st.markdown('</div>', unsafe_allow_html=True)
@@ -507,7 +512,8 @@ if st.session_state.show_results and st.session_state.item_desc:
     show_results(st.session_state.item_desc, uploaded_image=st.session_state.get("uploaded_image"))
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("🔄 Start over", key="reset"):
-        for key in ["upload_option", "item_desc", "uploaded_image", "cohere_parsed", "show_results", "selected_occasion"]:
+        for key in ["upload_option", "item_desc", "uploaded_image", "cohere_parsed", "show_results", "selected_occasion",
+                    "parse_future", "parse_error", "parse_filled"]:
             st.session_state.pop(key, None)
         st.rerun()
 
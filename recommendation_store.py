@@ -0,0 +1,293 @@
+"""
+recommendation_store.py
+-----------------------
+Offline precomputed recommendations: the top matches and the default
+outfit picks for every catalog item, stored as memory-mapped arrays
+indexed by item id.
+
+With hash jitter, results depend only on catalog attributes and the jitter
+epoch, so they are computed ahead of time with the batch APIs in matching_engine.py. Every
+seed keeps a signature of what its results depend on: its own scored
+attributes, the (gender, articleType) buckets its pools are built from, and
+the rule tables. A refresh only recomputes seeds whose signature changed.
+
+A build also records the stamp of the catalog files it was computed from
+(Catalog.stamp) and how many listing deltas had been applied on top;
+matchers ignore it while they serve a different catalog, and skip seeds
+and picks that later deltas changed.
+
+Layout:
+    data/recommendations/
+        meta.json
+        build-<ns>/seed_ids.npy        # sorted item ids
+        build-<ns>/signatures.npy      # uint64 dependency signature per seed
+        build-<ns>/match_ids.npy       # (seeds, num_matches), -1 = none
+        build-<ns>/match_scores.npy
+        build-<ns>/bundle_ids.npy      # (seeds, len(OUTFIT_ROLE_ORDER)), -1 = none
+        build-<ns>/bundle_scores.npy
+
+Run with:  python recommendation_store.py [--full]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from catalog_store import new_build_dir, publish_build, read_meta
+import matching_engine as engine
+from matching_engine import (
+    DEFAULT_CATALOG_PATH,
+    OUTFIT_ROLE_ORDER,
+    OutfitMatcher,
+    mix64,
+)
+
+
+FORMAT_VERSION = 5
+DEFAULT_STORE_PATH = "data/recommendations"
+
+# Attributes of an item that can change anyone's results
+SIGNATURE_COLUMNS = ["gender", "articleType", "baseColour", "usage", "season", "seller"]
+
+STORE_ARRAYS = [
+    "seed_ids", "signatures", "match_ids", "match_scores", "bundle_ids", "bundle_scores",
+]
+
+_MASK64 = (1 << 64) - 1
+
+
+# ---------------------------------------------------------------------------
+# SIGNATURES
+# ---------------------------------------------------------------------------
+def _text_hash(value):
+    """Stable 64-bit hash of a value's text (Python's hash() is salted)."""
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _rules_hash(rules, num_matches, jitter_epoch):
+    """Hash of everything besides the catalog that shapes the results."""
+    config = [
+        rules.fingerprint, OUTFIT_ROLE_ORDER,
+        [engine.COLOUR_SCORE, engine.USAGE_SCORE, engine.SEASON_SCORE,
+         engine.SAME_SELLER_SCORE, engine.JITTER_MIN, engine.JITTER_MAX],
+        num_matches, jitter_epoch, FORMAT_VERSION,
+    ]
+    return _text_hash(json.dumps(config, sort_keys=True))
+
+
+def _row_hashes(catalog):
+    """One uint64 per catalog row, over its id and SIGNATURE_COLUMNS."""
+    df = catalog.df
+    hashes = mix64(df["id"].to_numpy().astype(np.uint64))
+    for col in SIGNATURE_COLUMNS:
+        categories = df[col].cat.categories
+        table = np.array([_text_hash(c) for c in categories] + [0], dtype=np.uint64)
+        hashes = mix64(hashes ^ table[catalog.codes[col]])
+    return hashes
+
+
+def _dependent_types(rules, seed_article):
+    """Article types whose items can appear in a seed's matches or bundle."""
+    types = set(rules.category.get(seed_article, ()))
+    for role in OUTFIT_ROLE_ORDER:
+        types.update(rules.role_types(seed_article, role))
+    return types
+
+
+def seed_signatures(catalog, num_matches, jitter_epoch=0):
+    """
+    Signature per catalog row (in row order) that changes whenever that
+    seed's precomputed results could change.
+    """
+    rows = _row_hashes(catalog)
+
+    # Order-independent fingerprint of each (gender, articleType) bucket
+    fingerprints = {}
+    for gender, article, positions in catalog.buckets():
+        fingerprints[(gender, article)] = int(np.add.reduce(rows[positions], dtype=np.uint64))
+
+    rules = catalog.rules
+    config = _rules_hash(rules, num_matches, jitter_epoch)
+    signatures = mix64(rows ^ np.uint64(config))
+    for gender, article, positions in catalog.buckets():
+        depends = 0
+        for allowed in rules.gender.get(gender, [gender]):
+            for dep_type in _dependent_types(rules, article):
+                depends += fingerprints.get((allowed, dep_type), 0)
+        key = mix64(np.array([(depends + config) & _MASK64], dtype=np.uint64))
+        signatures[positions] = mix64(rows[positions] ^ key)
+    return signatures
+
+
+# ---------------------------------------------------------------------------
+# STORE
+# ---------------------------------------------------------------------------
+class RecommendationStore:
+    """Read-only, memory-mapped view of the current recommendations build."""
+
+    def __init__(self, path, meta):
+        build_dir = os.path.join(path, meta["build"])
+        for name in STORE_ARRAYS:
+            setattr(self, name, np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r"))
+        self.path = path
+        self.build = meta["build"]
+        catalog = meta["catalog"]
+        self.catalog_stamp = tuple(catalog) if catalog is not None else None
+        self.catalog_deltas = meta["catalog_deltas"]
+        self.num_matches = meta["num_matches"]
+        self.jitter_epoch = meta["jitter_epoch"]
+        self.rules = meta["rules"]
+
+    @classmethod
+    def open(cls, path=DEFAULT_STORE_PATH):
+        """Open the store at path, or return None if there is none (yet)."""
+        meta = read_meta(path)
+        if meta is None or meta.get("format_version") != FORMAT_VERSION:
+            return None
+        try:
+            return cls(path, meta)
+        except OSError:
+            return None
+
+    def reopened(self):
+        """The store's current build: self, or a fresh store if it was rebuilt."""
+        meta = read_meta(self.path)
+        if meta is None or meta.get("build") == self.build:
+            return self
+        return RecommendationStore.open(self.path) or self
+
+    def __len__(self):
+        return len(self.seed_ids)
+
+    def index_of(self, item_ids):
+        """Row of each item id in the store, -1 where it is not stored."""
+        item_ids = np.asarray(item_ids)
+        if len(self.seed_ids) == 0:
+            return np.full(len(item_ids), -1, dtype=np.intp)
+        rows = np.minimum(np.searchsorted(self.seed_ids, item_ids), len(self.seed_ids) - 1)
+        return np.where(self.seed_ids[rows] == item_ids, rows, -1)
+
+    def _row(self, item_id):
+        try:
+            row = int(self.index_of([item_id])[0])
+        except (TypeError, ValueError):
+            return None
+        return row if row >= 0 else None
+
+    def matches(self, item_id):
+        """(ids, scores) of the stored matches for item_id, best first, or None."""
+        row = self._row(item_id)
+        if row is None:
+            return None
+        ids = np.asarray(self.match_ids[row])
+        keep = ids >= 0
+        return ids[keep], np.asarray(self.match_scores[row])[keep]
+
+    def bundle(self, item_id):
+        """{role: id} of the stored bundle picks for item_id, or None."""
+        row = self._row(item_id)
+        if row is None:
+            return None
+        return {
+            OUTFIT_ROLE_ORDER[k]: int(pick)
+            for k, pick in enumerate(self.bundle_ids[row].tolist())
+            if pick >= 0
+        }
+
+
+def refresh_store(matcher, path=DEFAULT_STORE_PATH, num_matches=6, full=False):
+    """
+    Precompute matches and bundle picks for every item in matcher's
+    catalog and publish them as a new store build. Seeds whose signature is
+    unchanged since the previous build are copied over instead of being
+    recomputed, unless full=True.
+
+    Returns {"seeds": ..., "reused": ..., "recomputed": ...}.
+    """
+    if matcher.jitter != "hash":
+        raise ValueError("Precomputed recommendations need jitter='hash'")
+
+    # Precompute for listed items only: fold incremental updates in first
+    if matcher.catalog.delta_size():
+        matcher.compact_catalog()
+
+    catalog = matcher.catalog
+    jitter_epoch = matcher.current_jitter_epoch()
+    ids = catalog.ids
+    order = np.argsort(ids, kind="stable")
+    seed_ids = ids[order]
+    signatures = seed_signatures(catalog, num_matches, jitter_epoch)[order]
+
+    num_seeds, num_roles = len(seed_ids), len(OUTFIT_ROLE_ORDER)
+    match_ids = np.full((num_seeds, num_matches), -1, dtype=ids.dtype)
+    match_scores = np.zeros((num_seeds, num_matches), dtype=np.int16)
+    bundle_ids = np.full((num_seeds, num_roles), -1, dtype=ids.dtype)
+    bundle_scores = np.zeros((num_seeds, num_roles), dtype=np.int16)
+
+    reuse = np.zeros(num_seeds, dtype=bool)
+    previous = None if full else RecommendationStore.open(path)
+    if previous is not None and previous.num_matches == num_matches:
+        rows = previous.index_of(seed_ids)
+        found = np.flatnonzero(rows >= 0)
+        same = np.asarray(previous.signatures)[rows[found]] == signatures[found]
+        reuse[found[same]] = True
+        src = rows[reuse]
+        match_ids[reuse] = previous.match_ids[src]
+        match_scores[reuse] = previous.match_scores[src]
+        bundle_ids[reuse] = previous.bundle_ids[src]
+        bundle_scores[reuse] = previous.bundle_scores[src]
+
+    todo = seed_ids[~reuse]
+    if len(todo):
+        matches = matcher.get_matches_batch(todo, num_matches)
+        rows = np.searchsorted(seed_ids, matches["seed_id"].to_numpy())
+        ranks = matches["rank"].to_numpy()
+        match_ids[rows, ranks] = matches["id"].to_numpy()
+        match_scores[rows, ranks] = matches["score"].to_numpy()
+
+        # One pick per role: ask for every role, pages truncate to num_items
+        bundles = matcher.get_outfit_bundles_batch(todo, num_items=num_roles + 1)
+        rows = np.searchsorted(seed_ids, bundles["seed_id"].to_numpy())
+        roles = bundles["role"].cat.codes.to_numpy()
+        bundle_ids[rows, roles] = bundles["id"].to_numpy()
+        bundle_scores[rows, roles] = bundles["score"].to_numpy()
+
+    os.makedirs(path, exist_ok=True)
+    build, build_dir = new_build_dir(path)
+    arrays = {
+        "seed_ids": seed_ids, "signatures": signatures,
+        "match_ids": match_ids, "match_scores": match_scores,
+        "bundle_ids": bundle_ids, "bundle_scores": bundle_scores,
+    }
+    for name in STORE_ARRAYS:
+        np.save(os.path.join(build_dir, f"{name}.npy"), arrays[name])
+    publish_build(path, {
+        "format_version": FORMAT_VERSION,
+        "build":          build,
+        "seeds":          num_seeds,
+        "num_matches":    num_matches,
+        "jitter_epoch":   jitter_epoch,
+        "rules":          catalog.rules.fingerprint,
+        "catalog":        catalog.stamp,
+        "catalog_deltas": catalog.delta_count,
+    })
+
+    return {"seeds": num_seeds, "reused": int(reuse.sum()), "recomputed": len(todo)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute outfit recommendations.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+    parser.add_argument("--out", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--num-matches", type=int, default=6)
+    parser.add_argument("--full", action="store_true",
+                        help="recompute every seed instead of only changed ones")
+    args = parser.parse_args()
+
+    stats = refresh_store(OutfitMatcher(args.catalog), args.out, args.num_matches, args.full)
+    print(f"Recommendations for {stats['seeds']:,} items: "
+          f"{stats['recomputed']:,} recomputed, {stats['reused']:,} unchanged.")
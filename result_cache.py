@@ -0,0 +1,96 @@
+"""
+result_cache.py
+---------------
+Small thread-safe in-process cache with LRU eviction and a TTL, used by
+OutfitMatcher to serve repeated requests (every Streamlit rerun of an item
+page) without recomputing them, and by ImageStore for encoded thumbnails.
+
+Keys must already capture everything a value depends on — OutfitMatcher
+keys on (kind, item id, size, catalog version, jitter epoch), so a catalog
+reload or epoch change simply stops hitting the old entries, which then age
+out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Bounded mapping of key -> value. Holds at most max_entries values and
+    treats entries older than ttl seconds as missing (ttl=None: no expiry).
+    With max_bytes set, values must be bytes-like and their total len() is
+    kept under max_bytes as well.
+    """
+
+    def __init__(self, max_entries=1024, ttl=600, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (stored_at, value), oldest use first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the cached value for key (marking it recently used), or default."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None \
+                    and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), value)
+            if self.max_bytes is not None:
+                self._bytes += len(value)
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        """Remove key (lock held)."""
+        _, value = self._entries.pop(key)
+        if self.max_bytes is not None:
+            self._bytes -= len(value)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters and current size, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size":        len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes":       self._bytes,
+                "hits":        self.hits,
+                "misses":      self.misses,
+                "hit_rate":    self.hits / lookups if lookups else 0.0,
+                "evictions":   self.evictions,
+                "expirations": self.expirations,
+            }
@@ -1,12 +1,44 @@
 import pandas as pd
 import random
 
+from catalog_store import artifact_path_for, prepare_catalog, write_catalog_artifact
+from image_store import build_thumbnails
+from matching_engine import OutfitMatcher, RuleSet, encode_catalog
+from recommendation_store import refresh_store
+
+CATALOG_PATH = 'data/vinted_catalog.csv'
+
+
+def synthetic_listing(item_id):
+    """
+    Synthetic seller, price and condition for an item, drawn from a
+    generator seeded with its id. Every run gives an item the same values,
+    so a rerun only changes the signatures of items that really changed.
+    """
+    rng = random.Random(int(item_id))
+    return (f"User{rng.randint(1000, 9999)}", rng.randint(5, 150),
+            rng.choice(['New', 'Like new', 'Good', 'Fair']))
+
+
 # Read CSV with error handling
 df = pd.read_csv('data/styles.csv', on_bad_lines='skip')
 
-df['seller'] = [f"User{random.randint(1000, 9999)}" for _ in range(len(df))]
-df['price'] = [random.randint(5, 150) for _ in range(len(df))]
-df['condition'] = [random.choice(['New', 'Like new', 'Good', 'Fair']) for _ in range(len(df))]
+df['seller'], df['price'], df['condition'] = zip(*(synthetic_listing(i) for i in df['id']))
 
-df.to_csv('data/vinted_catalog.csv', index=False)
+df.to_csv(CATALOG_PATH, index=False)
 print(f"Created vinted_catalog.csv with {len(df)} items!")
+
+# Preprocessed columnar copy for fast matcher cold starts
+rules = RuleSet.load()
+catalog = encode_catalog(prepare_catalog(pd.read_csv(CATALOG_PATH, on_bad_lines='skip')), rules)
+build = write_catalog_artifact(catalog, artifact_path_for(CATALOG_PATH), source_path=CATALOG_PATH)
+print(f"Wrote columnar catalog {build} with {len(catalog)} items!")
+
+# Refresh precomputed recommendations (only seeds affected by changes),
+# from the files just written so the store records their stamp
+stats = refresh_store(OutfitMatcher(CATALOG_PATH))
+print(f"Recommendations: {stats['recomputed']} recomputed, {stats['reused']} unchanged.")
+
+# Grid/detail thumbnails so the app never decodes full-size images
+stats = build_thumbnails()
+print(f"Thumbnails: {stats['written']} written, {stats['skipped']} up to date.")